@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+import numpy as np
+import pandas as pd
+from loguru import logger
+# Nothing importing app.config at the top: configure() has to set the endpoints first
+from app.data.schemas import KlineIntervals
+from app.data.synthetic import simulated_symbols
+
+ALERT_PATTERN = re.compile(r"(Buy|Sell) Opportunity for (.+?)!")
+ALERT_TIME_PATTERNS = {"Buy": re.compile(r"⏰ Time: (.+)"), "Sell": re.compile(r"⏰ Sell Time: (.+)")}
+
+
+def start_simulator(args):
+    """Run the Binance and Telegram stand-ins in their own process, so they don't compete with the app."""
+    command = [
+        sys.executable, "-m", "app.benchmarks.simulator",
+        "--symbols", str(args.symbols), "--interval", args.interval,
+        "--candles", str(1000 + args.cycles + 100),
+        "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+        "--telegram-error-rate", str(args.telegram_error_rate),
+        "--telegram-flood-rate", str(args.telegram_flood_rate),
+        "--binance-port", str(args.binance_port), "--telegram-port", str(args.telegram_port),
+    ]
+    if args.weight_limit:
+        command += ["--weight-limit", str(args.weight_limit)]
+    process = subprocess.Popen(command)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{args.binance_port}/stats").raise_for_status()
+            httpx.get(f"http://127.0.0.1:{args.telegram_port}/messages").raise_for_status()
+            return process
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                raise RuntimeError(f"Simulator exited with code {process.returncode}")
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("Simulator did not start in 60s")
+
+
+def configure(args):
+    """Point the app at the stand-ins; must run before app.main is imported (config is read at import)."""
+    os.environ.update({
+        "BINANCE_BASE_URL": f"http://127.0.0.1:{args.binance_port}",
+        "BINANCE_WS_URL": f"ws://127.0.0.1:{args.binance_port}",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{args.telegram_port}",
+        "BOT_TOKEN": "harness",
+        "CHANNEL_ID": "harness",
+        "KLINE_INTERVAL": args.interval,
+        "STRATEGY_INTERVALS": args.interval,
+        "INGESTION_MODE": "rest",
+        "SCHEDULER_WORKERS": "0",
+        "FETCH_CONCURRENCY": str(args.concurrency),
+        "SNAPSHOT_PATH": os.path.join(tempfile.mkdtemp(prefix="harness-"), "state.pkl"),
+    })
+    if args.weight_budget:
+        os.environ["BINANCE_WEIGHT_BUDGET"] = str(args.weight_budget)
+    if args.rules:
+        # Random walks rarely meet the default Buy rule: looser rules exercise the alert path
+        os.environ["STRATEGY_RULES_FILE"] = args.rules
+    if not args.telegram_limits:
+        # Measure the pipeline, not Telegram's per-chat rate limit
+        os.environ["TELEGRAM_GLOBAL_RATE"] = "100000"
+        os.environ["TELEGRAM_CHAT_RATE_PER_MINUTE"] = "6000000"
+
+
+async def drive(args, symbols):
+    """Warm up every symbol, then run `args.cycles` candle cycles through fetch_and_check_opportunity."""
+    from app import main
+    from app.scheduler import run_candle_cycles
+
+    decisions = []
+
+    async def record(symbol, close_time, close_price, opportunity, indicators=None):
+        decisions.append({"decided": time.time(), "symbol": symbol, "close_time": close_time,
+                          "close_price": close_price, "opportunity": opportunity})
+        await main.handle_opportunity(symbol, close_time, close_price, opportunity, indicators)
+
+    main.monitor.on_decision = record
+    main.telegram_notifier.start()
+
+    # Seed the buffers and indicator engines outside of the measured cycles
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def warm_up(symbol):
+        async with semaphore:
+            await main.fetch_and_check_opportunity(symbol)
+
+    started = time.time()
+    await asyncio.gather(*map(warm_up, symbols))
+    # Alerts of the warm-up candles must not be delivered during the measured cycles
+    await main.telegram_notifier.queue.join()
+    logger.warning(f"Warmed up {len(symbols)} symbols in {time.time() - started:.1f}s")
+    first_open_time = {}
+    for symbol in symbols:
+        buffer = main.kline_cache.get(symbol, args.interval)
+        if buffer is not None and len(buffer):
+            first_open_time[symbol] = int(buffer.since(None)[0][0])
+    initial_signals = {symbol: dict(signal) for symbol, signal in main.signals.items()}
+    decisions.clear()
+
+    cycles = []
+    measured_from = time.time()
+
+    def on_cycle(report):
+        cycles.append(report)
+        if len(cycles) >= args.cycles:
+            task.cancel()
+
+    task = asyncio.create_task(run_candle_cycles(
+        symbols, main.fetch_and_check_opportunity, args.interval, args.concurrency,
+        settle_delay=args.settle_delay, on_cycle=on_cycle,
+    ))
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    measured_until = time.time()
+
+    await main.telegram_notifier.stop()
+    await main.binance_client.aclose()
+    return {
+        "decisions": decisions, "cycles": cycles, "first_open_time": first_open_time,
+        "initial_signals": initial_signals, "measured_from": measured_from, "measured_until": measured_until,
+    }
+
+
+async def fetch_histories(args, first_open_time):
+    """Klines the engines saw, fetched back from the simulator (retrying injected faults)."""
+    from app.data.client import AsyncBinanceClient
+    from app.data.exceptions import BinanceAPIError
+
+    histories = {}
+    async with AsyncBinanceClient(base_url=f"http://127.0.0.1:{args.binance_port}",
+                                  max_connections=args.concurrency) as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def fetch(symbol, start_time):
+            async with semaphore:
+                for _ in range(10):
+                    try:
+                        histories[symbol] = await client.get_klines(symbol, args.interval, limit=100_000,
+                                                                    start_time=start_time)
+                        return
+                    except BinanceAPIError:
+                        await asyncio.sleep(0.5)
+
+        await asyncio.gather(*(fetch(symbol, start) for symbol, start in first_open_time.items()))
+    return histories
+
+
+def expected_opportunities(rows, since_ms):
+    """{(formatted close_time, close_price): (close_time_ms, opportunity)} of the candles closed after `since_ms`.
+
+    The close price tells apart 1s candles whose formatted close times collide (xx:59 is rounded up).
+    """
+    from app.data.cache import KlineRingBuffer
+    from app.strategies.features import FeatureGraph
+    from app.strategies.indicators import format_close_time
+    from app.strategies.registry import evaluate_strategies
+
+    buffer = KlineRingBuffer(len(rows))
+    buffer.extend(rows)
+    graph = FeatureGraph.from_buffer(buffer)
+    opportunity = evaluate_strategies(graph, ["enhanced"], last_n=None)["enhanced"]
+    expected = {}
+    for i in np.flatnonzero(graph.close_time >= since_ms):
+        close_time_ms = int(graph.close_time[i])
+        close_time = format_close_time(pd.Timestamp(close_time_ms, unit="ms", tz="UTC"))
+        expected[close_time, float(graph["close_price"][i])] = (close_time_ms, opportunity[i])
+    return expected
+
+
+def expected_alerts(decisions, expected, initial_signals):
+    """Replay handle_opportunity's Buy/Sell bookkeeping on the expected opportunities."""
+    signals = {symbol: dict(signal) for symbol, signal in initial_signals.items()}
+    alerts = {}
+    for decision in decisions:
+        symbol, close_time, close_price = decision["symbol"], decision["close_time"], decision["close_price"]
+        if (close_time, close_price) not in expected.get(symbol, {}):
+            continue
+        close_time_ms, opportunity = expected[symbol][close_time, close_price]
+        if opportunity == "Buy" and symbol not in signals:
+            signals[symbol] = {"buy_price": close_price}
+            alerts.setdefault(("Buy", symbol, close_time), close_time_ms)
+        elif opportunity == "Sell" and symbol in signals and close_price > signals[symbol]["buy_price"]:
+            del signals[symbol]
+            alerts.setdefault(("Sell", symbol, close_time), close_time_ms)
+    return alerts
+
+
+def parse_alert(text):
+    match = ALERT_PATTERN.search(text)
+    if match is None:
+        return None
+    kind, symbol = match.groups()
+    close_time = ALERT_TIME_PATTERNS[kind].search(text)
+    return kind, symbol, close_time.group(1).strip() if close_time else None
+
+
+def percentiles(values):
+    if not len(values):
+        return None
+    values = np.asarray(values)
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+            "p99": float(np.percentile(values, 99)), "max": float(values.max())}
+
+
+def report(args, run, histories, messages, simulator_stats):
+    decisions = run["decisions"]
+    interval_ms = KlineIntervals.to_milliseconds(args.interval)
+    since_ms = int(run["measured_from"] * 1000) - 2 * interval_ms
+    expected = {symbol: expected_opportunities(rows, since_ms) for symbol, rows in histories.items()}
+
+    # Correctness of every decision against the opportunity computed offline on the same candles
+    checked, mismatched, unknown, latencies = 0, [], 0, []
+    for decision in decisions:
+        entry = expected.get(decision["symbol"], {}).get((decision["close_time"], decision["close_price"]))
+        if entry is None:
+            unknown += 1
+            continue
+        close_time_ms, opportunity = entry
+        checked += 1
+        latencies.append(decision["decided"] - (close_time_ms + 1) / 1000)
+        if decision["opportunity"] != opportunity:
+            mismatched.append({**decision, "expected": opportunity})
+
+    # Alerts: captured by the Telegram stand-in vs the ones the expected opportunities call for
+    wanted = expected_alerts(decisions, expected, run["initial_signals"])
+    delivered, unexpected, alert_latencies = set(), [], []
+    for message in messages:
+        alert = parse_alert(message["text"] or "")
+        if alert in wanted:
+            delivered.add(alert)
+            alert_latencies.append(message["received"] - (wanted[alert] + 1) / 1000)
+        elif alert is not None:
+            unexpected.append(message["text"])
+
+    duration = run["measured_until"] - run["measured_from"]
+    cycle_seconds = [cycle["duration"] for cycle in run["cycles"]]
+    return {
+        "symbols": args.symbols,
+        "interval": args.interval,
+        "cycles": len(run["cycles"]),
+        "seconds": duration,
+        "decisions": len(decisions),
+        "decisions_per_second": len(decisions) / duration if duration else None,
+        "cycle_seconds": percentiles(cycle_seconds),
+        "late_symbols": sum(len(cycle["late"]) for cycle in run["cycles"]),
+        "decision_latency_seconds": percentiles(latencies),
+        "correctness": {"checked": checked, "mismatched": len(mismatched), "unknown_candles": unknown,
+                        "examples": mismatched[:5]},
+        "alerts": {"expected": len(wanted), "delivered": len(delivered), "missing": len(set(wanted) - delivered),
+                   "unexpected": len(unexpected), "latency_seconds": percentiles(alert_latencies)},
+        "simulator": simulator_stats,
+    }
+
+
+def print_report(result):
+    def fmt(stats):
+        return "n/a" if stats is None else "  ".join(f"{k}={v * 1000:.0f}ms" for k, v in stats.items())
+
+    correctness, alerts = result["correctness"], result["alerts"]
+    print(f"symbols={result['symbols']} interval={result['interval']} cycles={result['cycles']} "
+          f"in {result['seconds']:.1f}s")
+    print(f"decisions: {result['decisions']} ({result['decisions_per_second']:.1f}/s), "
+          f"late symbols: {result['late_symbols']}")
+    print(f"cycle duration:        {fmt(result['cycle_seconds'])}")
+    print(f"close -> decision:     {fmt(result['decision_latency_seconds'])}")
+    print(f"close -> alert:        {fmt(alerts['latency_seconds'])}")
+    print(f"correctness: {correctness['checked'] - correctness['mismatched']}/{correctness['checked']} decisions "
+          f"match ({correctness['unknown_candles']} on candles before the run)")
+    print(f"alerts: {alerts['delivered']}/{alerts['expected']} delivered, {alerts['missing']} missing, "
+          f"{alerts['unexpected']} unexpected")
+    print(f"simulator: {result['simulator']}")
+
+
+def main(args):
+    symbols = simulated_symbols(args.symbols)
+    configure(args)
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    simulator = start_simulator(args)
+    try:
+        run = asyncio.run(drive(args, symbols))
+        histories = asyncio.run(fetch_histories(args, run["first_open_time"]))
+        captured = httpx.get(f"http://127.0.0.1:{args.telegram_port}/messages",
+                             params={"since": run["measured_from"]}).json()
+        binance_stats = httpx.get(f"http://127.0.0.1:{args.binance_port}/stats").json()
+    finally:
+        simulator.terminate()
+        simulator.wait(10)
+
+    result = report(args, run, histories, captured["messages"],
+                    {"binance": binance_stats, "telegram": captured["stats"]})
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drive fetch_and_check_opportunity against the local simulator and report "
+                    "throughput, latency and correctness")
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--interval", default="1s", help="Candle interval; 1s replays 5m-like data 300x faster")
+    parser.add_argument("--cycles", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--settle-delay", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every Binance response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of Binance requests answering 500")
+    parser.add_argument("--weight-limit", type=int, help="Simulated Binance weight limit per minute")
+    parser.add_argument("--weight-budget", type=int, help="BINANCE_WEIGHT_BUDGET of the app")
+    parser.add_argument("--rules", help="Strategy rules JSON (STRATEGY_RULES_FILE) for the app and the expected signals")
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-flood-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-limits", action="store_true", help="Keep the app's Telegram rate limits")
+    parser.add_argument("--binance-port", type=int, default=8765)
+    parser.add_argument("--telegram-port", type=int, default=8766)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Write the report as JSON")
+    main(parser.parse_args())
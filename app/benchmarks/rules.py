@@ -0,0 +1,60 @@
+import argparse
+import timeit
+import numpy as np
+from app.data.klines import BinanceKlines
+from app.data.synthetic import synthetic_klines
+from app.strategies.indicators import Strategy, DEFAULT_RULESET
+
+
+def apply_legacy_rules(data):
+    """The row-wise DataFrame.apply signals that the compiled rules replaced."""
+    opportunity = data.apply(
+        lambda row: "Buy" if row['RSI'] < 40 and row['close_price'] <= row['BB_lower']
+                    and row['MA_10'] > row['MA_50'] and row['EMA_9'] > row['EMA_21']
+                    and row['MACD'] > row['MACD_signal'] and row['close_price'] > row['VWAP']
+                    else None,
+        axis=1
+    )
+    data = data.assign(opportunity_type=opportunity)
+    return data.apply(
+        lambda row: "Sell" if row['RSI'] > 70 or row['close_price'] >= row['BB_upper']
+                    and row['MA_10'] < row['MA_50'] and row['EMA_9'] < row['EMA_21']
+                    and row['MACD'] < row['MACD_signal'] and row['close_price'] < row['VWAP']
+                    else row['opportunity_type'],
+        axis=1
+    )
+
+
+def indicator_frame(rows, seed=0):
+    klines = BinanceKlines("BENCHUSDT", "5m")
+    klines.data = synthetic_klines(rows, seed)
+    strategy = Strategy(klines.convert_data_to_dataframe())
+    return strategy.enhanced_strategy().drop(columns=['opportunity_type'])
+
+
+def run(rows=1000, repeat=5):
+    """Time the apply-based signals against the compiled rules on the same indicator frame."""
+    data = indicator_frame(rows)
+    legacy = apply_legacy_rules(data).to_numpy(dtype=object)
+    compiled = DEFAULT_RULESET.evaluate(data)
+    if not all(a == b for a, b in zip(legacy, compiled)):
+        raise AssertionError("Compiled rules disagree with the apply-based signals")
+
+    timings = {
+        "apply": min(timeit.repeat(lambda: apply_legacy_rules(data), number=1, repeat=repeat)),
+        "compiled": min(timeit.repeat(lambda: DEFAULT_RULESET.evaluate(data), number=1, repeat=repeat)),
+        "compiled_last_row": min(timeit.repeat(lambda: DEFAULT_RULESET.evaluate(data, last_n=1),
+                                               number=1, repeat=repeat)),
+    }
+    signals = {label: int(np.sum(compiled == label)) for label in ("Buy", "Sell")}
+    return {"rows": rows, "signals": signals, "seconds": timings,
+            "speedup": timings["apply"] / timings["compiled"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark apply-based vs compiled signal rules")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for rows in args.rows:
+        print(run(rows, args.repeat))
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+from app.data.replay_server import KlineReplay
+from app.data.synthetic import simulated_symbols
+
+
+class TelegramCapture:
+    """Stand-in for the Telegram Bot API that records every sendMessage instead of delivering it.
+
+    Faults are injected like the real API's: a share `error_rate` of requests
+    answer 500 and `flood_rate` answer 429 with a `retry_after`.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, flood_rate=0.0, retry_after=1, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.messages = []
+        self.stats = {"requests": 0, "429": 0, "500": 0}
+
+        self.app = FastAPI()
+        self.app.post("/bot{token}/sendMessage")(self.send_message)
+        self.app.get("/messages")(self.get_messages)
+
+    async def send_message(self, token: str, request: Request):
+        self.stats["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        draw = self.random.random()
+        if draw < self.flood_rate:
+            self.stats["429"] += 1
+            return JSONResponse({"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                 "parameters": {"retry_after": self.retry_after}}, status_code=429)
+        if draw < self.flood_rate + self.error_rate:
+            self.stats["500"] += 1
+            return JSONResponse({"ok": False, "error_code": 500, "description": "Internal Server Error"},
+                                status_code=500)
+
+        payload = await request.json()
+        self.messages.append({"received": time.time(), "chat_id": payload.get("chat_id"),
+                              "text": payload.get("text")})
+        return {"ok": True, "result": {"message_id": len(self.messages)}}
+
+    async def get_messages(self, since: float = 0):
+        """Captured messages received at or after `since` (Unix time)."""
+        return {"messages": [m for m in self.messages if m["received"] >= since], "stats": self.stats}
+
+
+async def serve(replay, telegram, host="127.0.0.1", binance_port=8765, telegram_port=8766):
+    """Serve the Binance replay and the Telegram stand-in until either stops (e.g. on SIGTERM)."""
+    server = uvicorn.Server(uvicorn.Config(telegram.app, host=host, port=telegram_port, log_level="warning"))
+    tasks = [asyncio.create_task(replay.serve(host, binance_port)), asyncio.create_task(server.serve())]
+    logger.info(f"Telegram stand-in on http://{host}:{telegram_port}")
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Binance and Telegram stand-ins for load tests")
+    parser.add_argument("--symbols", type=int, default=100, help="Number of synthetic symbols (SIM0000USDT, ...)")
+    parser.add_argument("--history", help="JSON file of recorded klines: {symbol: [rows]}, instead of --symbols")
+    parser.add_argument("--interval", default="1s")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay clock speed-up")
+    parser.add_argument("--candles", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every Binance response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of Binance requests answering 500")
+    parser.add_argument("--weight-limit", type=int, help="Binance answers 429/418 above this weight per minute")
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-flood-rate", type=float, default=0.0, help="Share of messages answering 429")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--binance-port", type=int, default=8765)
+    parser.add_argument("--telegram-port", type=int, default=8766)
+    args = parser.parse_args()
+
+    faults = {"speed": args.speed, "weight_limit": args.weight_limit, "latency": args.latency,
+              "error_rate": args.error_rate}
+    if args.history:
+        with open(args.history) as f:
+            replay = KlineReplay(json.load(f), args.interval, **faults)
+    else:
+        replay = KlineReplay.synthetic(simulated_symbols(args.symbols), args.interval, args.candles, **faults)
+    telegram = TelegramCapture(args.telegram_latency, args.telegram_error_rate, args.telegram_flood_rate)
+    asyncio.run(serve(replay, telegram, args.host, args.binance_port, args.telegram_port))
@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from app.data.cache import KlineRingBuffer, build_klines_frame, parse_kline_payload
+from app.data.klines import BinanceKlines
+from app.data.synthetic import synthetic_klines
+from app.strategies.batch import batch_indicators, batch_opportunities
+from app.strategies.features import FeatureGraph
+from app.strategies.indicators import Strategy, get_opportunity
+from app.strategies.registry import enhanced_features, evaluate_strategies, register_strategy
+from app.strategies.schemas import DataFrameUtils
+from app.strategies.streaming import IndicatorEngine
+
+ROWS = (1000, 10000, 100000)
+SYMBOLS = (10, 100, 1000)
+# Symbol-scaled cases use the live buffer size
+SYMBOL_ROWS = 1000
+
+# name -> (scale, setup); setup(rows, symbols) prepares the inputs and returns the callable to time
+CASES = {}
+
+
+def case(name, scale):
+    def register(setup):
+        CASES[name] = (scale, setup)
+        return setup
+    return register
+
+
+def klines_frame(klines):
+    binance_klines = BinanceKlines("BENCHUSDT", "5m")
+    binance_klines.data = klines
+    return binance_klines.convert_data_to_dataframe()
+
+
+@case("decode", "rows")
+def decode(rows, symbols):
+    payload = json.dumps(synthetic_klines(rows)).encode()
+    return lambda: json.loads(payload)
+
+
+@case("convert_data_to_dataframe", "rows")
+def convert(rows, symbols):
+    binance_klines = BinanceKlines("BENCHUSDT", "5m")
+    binance_klines.data = synthetic_klines(rows)
+    return binance_klines.convert_data_to_dataframe
+
+
+@case("parse_kline_payload", "rows")
+def parse_payload(rows, symbols):
+    """Raw response bytes to the klines frame; compare with decode + convert_data_to_dataframe."""
+    payload = json.dumps(synthetic_klines(rows)).encode()
+    return lambda: build_klines_frame(*parse_kline_payload(payload))
+
+
+@case("fill_missing_values", "rows")
+def fill_missing_values(rows, symbols):
+    # The enhanced_strategy frame right before filling: indicators still warming up are NaN
+    data = klines_frame(synthetic_klines(rows))
+    close_time = data.index.to_numpy().astype("datetime64[ms]").astype(np.int64)
+    columns = [data[col].to_numpy()[None, :] for col in ("close_price", "high_price", "low_price", "volume")]
+    indicators = batch_indicators(*columns, close_time)
+    data = data.assign(**{name: values[0] for name, values in indicators.items() if name != "close_price"})
+    data['opportunity_type'] = None
+    return lambda: DataFrameUtils.fill_missing_values(data)
+
+
+@case("enhanced_strategy", "rows")
+def enhanced_strategy(rows, symbols):
+    strategy = Strategy(klines_frame(synthetic_klines(rows)))
+    return strategy.enhanced_strategy
+
+
+@case("registered_strategies", "rows")
+def registered_strategies(rows, symbols):
+    """20 strategies over overlapping features on one graph; should cost about the union of their features."""
+    features = list(enhanced_features().values())
+    names = []
+    for i in range(20):
+        name = f"bench_{i}"
+        left, right = features[i % len(features)], features[(i * 7 + 3) % len(features)]
+        register_strategy(name, [{"opportunity": "Buy", "when": [left, ">", right]}])
+        names.append(name)
+    data = klines_frame(synthetic_klines(rows))
+    return lambda: evaluate_strategies(FeatureGraph.from_frame(data), names)
+
+
+@case("get_opportunity", "symbols")
+def get_opportunity_end_to_end(rows, symbols):
+    """Raw klines -> frame -> indicators -> decision for every symbol, like the original cycle."""
+    payloads = [synthetic_klines(rows, seed) for seed in range(symbols)]
+    return lambda: [get_opportunity(klines_frame(klines)) for klines in payloads]
+
+
+@case("get_opportunity_low_memory", "symbols")
+def get_opportunity_low_memory(rows, symbols):
+    """get_opportunity_end_to_end in LOW_MEMORY mode: indicators next to the frame, no copies."""
+    payloads = [synthetic_klines(rows, seed) for seed in range(symbols)]
+    return lambda: [get_opportunity(klines_frame(klines), low_memory=True) for klines in payloads]
+
+
+@case("indicator_engine_cycle", "symbols")
+def indicator_engine_cycle(rows, symbols):
+    """One live cycle of the incremental path: append the next candle and re-evaluate every symbol."""
+    extra = 64
+    payloads = [synthetic_klines(rows + extra, seed) for seed in range(symbols)]
+    buffers, engines = [], []
+    for klines in payloads:
+        buffer = KlineRingBuffer(rows)
+        buffer.extend(klines[:rows])
+        engine = IndicatorEngine()
+        engine.sync(buffer)
+        buffers.append(buffer)
+        engines.append(engine)
+    position = [rows]
+
+    def cycle():
+        i = position[0] % (rows + extra)
+        position[0] += 1
+        for klines, buffer, engine in zip(payloads, buffers, engines):
+            buffer.extend(klines[i:i + 1])
+            engine.sync(buffer)
+            engine.get_opportunity()
+    return cycle
+
+
+@case("batch_opportunities", "symbols")
+def batch(rows, symbols):
+    frames = {f"S{seed}USDT": klines_frame(synthetic_klines(rows, seed)) for seed in range(symbols)}
+    return lambda: batch_opportunities(frames)
+
+
+def measure(fn, repeat):
+    """Wall time of `repeat` runs after a warm-up, and the peak memory of one traced run."""
+    fn()
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": {"min": min(seconds), "median": statistics.median(seconds), "mean": statistics.fmean(seconds)},
+        "peak_memory_bytes": peak,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(cases=None, rows=ROWS, symbols=SYMBOLS, repeat=5, max_work=None):
+    """Run the selected cases at every size; `max_work` skips sizes above rows * symbols."""
+    results = []
+    for name in cases or CASES:
+        scale, setup = CASES[name]
+        sizes = [(n, 1) for n in rows] if scale == "rows" else [(SYMBOL_ROWS, n) for n in symbols]
+        for n_rows, n_symbols in sizes:
+            if max_work and n_rows * n_symbols > max_work:
+                continue
+            # Big sizes take seconds per run: repeat them less
+            runs = max(1, min(repeat, repeat * 10_000 // (n_rows * n_symbols)))
+            result = measure(setup(n_rows, n_symbols), runs)
+            results.append({"case": name, "rows": n_rows, "symbols": n_symbols, "repeat": runs, **result})
+            print(f"{name:<28} rows={n_rows:<7} symbols={n_symbols:<5} {result['seconds']['min'] * 1000:10.2f} ms  "
+                  f"{result['peak_memory_bytes'] / 1e6:8.1f} MB", flush=True)
+    return {"environment": environment(), "results": results}
+
+
+def compare(baseline, current, tolerance=0.1):
+    """Rows of (case, rows, symbols, time ratio, memory ratio, regressed) against a baseline run."""
+    previous = {(r["case"], r["rows"], r["symbols"]): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = previous.get((result["case"], result["rows"], result["symbols"]))
+        if before is None:
+            continue
+        time_ratio = result["seconds"]["min"] / before["seconds"]["min"]
+        memory_ratio = result["peak_memory_bytes"] / max(before["peak_memory_bytes"], 1)
+        rows.append((result["case"], result["rows"], result["symbols"], time_ratio, memory_ratio,
+                     time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the data and strategy hot paths")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), help="Defaults to all cases")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(ROWS))
+    parser.add_argument("--symbols", type=int, nargs="+", default=list(SYMBOLS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-work", type=int, help="Skip sizes with more than this many rows x symbols")
+    parser.add_argument("--output", help="Write the results as JSON, e.g. benchmarks/<commit>.json")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    report = run(args.cases, args.rows, args.symbols, args.repeat, args.max_work)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        for name, n_rows, n_symbols, time_ratio, memory_ratio, regressed in compare(baseline, report,
+                                                                                     args.tolerance):
+            regressions += regressed
+            print(f"{name:<28} rows={n_rows:<7} symbols={n_symbols:<5} time x{time_ratio:.2f}  "
+                  f"memory x{memory_ratio:.2f}{'  REGRESSION' if regressed else ''}")
+        raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,58 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from app/.env
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+# Binance REST settings
+BINANCE_BASE_URL = os.getenv("BINANCE_BASE_URL", "https://api.binance.com")
+BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
+BINANCE_TIMEOUT = float(os.getenv("BINANCE_TIMEOUT", "10"))
+
+# Maximum number of symbols fetched at the same time (also the connection pool size)
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "10"))
+# Request weight we allow ourselves per minute (Binance bans IPs above 6000), and how often a
+# request is retried after a 429/418 once its Retry-After has passed
+BINANCE_WEIGHT_BUDGET = int(os.getenv("BINANCE_WEIGHT_BUDGET", "4800"))
+BINANCE_MAX_RETRIES = int(os.getenv("BINANCE_MAX_RETRIES", "3"))
+
+# Interval of the candles the strategy is evaluated on
+KLINE_INTERVAL = os.getenv("KLINE_INTERVAL", "5m")
+# Intervals the strategy runs on; higher ones are derived locally from KLINE_INTERVAL candles
+STRATEGY_INTERVALS = [i.strip() for i in os.getenv("STRATEGY_INTERVALS", KLINE_INTERVAL).split(",") if i.strip()]
+
+# REST polling runs right after every candle close: wait CANDLE_SETTLE_DELAY seconds for the
+# exchange to publish the closed candle, and give up on symbols still running after CYCLE_DEADLINE
+CANDLE_SETTLE_DELAY = float(os.getenv("CANDLE_SETTLE_DELAY", "2"))
+CYCLE_DEADLINE = float(os.getenv("CYCLE_DEADLINE", "60"))
+
+# Worker processes the symbols are sharded across; 0 evaluates everything in the server process
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "0"))
+
+# Keep prices and volumes as float32 and evaluate strategies on views instead of frame copies
+LOW_MEMORY = os.getenv("LOW_MEMORY", "false").lower() in ("1", "true", "yes")
+
+# Kline ingestion: "rest" polls the REST API, "websocket" listens to kline streams
+INGESTION_MODE = os.getenv("INGESTION_MODE", "rest")
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443")
+STREAM_SYMBOLS_PER_CONNECTION = int(os.getenv("STREAM_SYMBOLS_PER_CONNECTION", "200"))
+
+# Telegram delivery
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+CHANNEL_ID = os.getenv("CHANNEL_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "1000"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "5"))
+# Telegram allows ~30 messages/s overall and 20 messages/minute in a group or channel
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE_PER_MINUTE = float(os.getenv("TELEGRAM_CHAT_RATE_PER_MINUTE", "20"))
+
+# Local historical kline store
+KLINE_STORE_DIR = os.getenv("KLINE_STORE_DIR", "klines_store")
+
+# Recent decisions kept for the read API
+READ_MODEL_DECISIONS = int(os.getenv("READ_MODEL_DECISIONS", "1000"))
+
+# Warm-start snapshots of buffers, indicator state and signals
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "snapshots/state.pkl")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "60"))
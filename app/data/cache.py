@@ -0,0 +1,239 @@
+import time
+import numpy as np
+import pandas as pd
+from loguru import logger
+from app import config
+from app.data.schemas import KlineColumns, KlineIntervals
+from app.metrics import STAGE_SECONDS
+
+# Positions of the typed fields inside a raw Binance kline row
+_FLOAT_INDEX = [KlineColumns.COLUMNS.index(col) for col in KlineColumns.FLOAT_COLUMNS]
+_OPEN_TIME_INDEX = KlineColumns.COLUMNS.index("open_time")
+_CLOSE_TIME_INDEX = KlineColumns.COLUMNS.index("close_time")
+_TRADES_INDEX = KlineColumns.COLUMNS.index("number_of_trades")
+
+
+def parse_kline_rows(rows):
+    """Convert raw Binance kline rows into (open_time, close_time, trades, values) arrays."""
+    arr = np.asarray(rows, dtype=object).reshape(-1, len(KlineColumns.COLUMNS))
+    open_time = arr[:, _OPEN_TIME_INDEX].astype(np.int64)
+    close_time = arr[:, _CLOSE_TIME_INDEX].astype(np.int64)
+    trades = arr[:, _TRADES_INDEX].astype(np.int64)
+    values = arr[:, _FLOAT_INDEX].astype(np.float64)
+    return open_time, close_time, trades, values
+
+
+def parse_kline_payload(payload):
+    """Decode a raw /api/v3/klines response body straight into (open_time, close_time, trades, values).
+
+    The brackets and quotes are stripped and every field is parsed in one
+    C-level pass, without building the Python lists and strings of response.json().
+    """
+    text = payload.translate(None, b'[]"')
+    flat = np.empty(0) if not text or text.isspace() else np.fromstring(text, sep=",")
+    del text  # Free the stripped copy before the columns are built
+    if flat.size % len(KlineColumns.COLUMNS):
+        raise ValueError(f"Malformed klines payload: {payload[:100]!r}")
+    table = flat.reshape(-1, len(KlineColumns.COLUMNS))
+    # Millisecond timestamps (< 2**53) and trade counts are exact in float64
+    open_time = table[:, _OPEN_TIME_INDEX].astype(np.int64)
+    close_time = table[:, _CLOSE_TIME_INDEX].astype(np.int64)
+    trades = table[:, _TRADES_INDEX].astype(np.int64)
+    # Column-major, so build_klines_frame can wrap the float columns without copying them
+    values = table.T[_FLOAT_INDEX].T
+    return open_time, close_time, trades, values
+
+
+def build_klines_frame(open_time, close_time, trades, values):
+    """Build the BinanceKlines.convert_data_to_dataframe frame from typed columns.
+
+    The float columns stay a view of `values` (no copy when it is column-major,
+    as parse_kline_payload returns it).
+    """
+    df = pd.DataFrame(values, columns=list(KlineColumns.FLOAT_COLUMNS), copy=False)
+    df.insert(0, "open_time", open_time.astype("datetime64[ms]").astype("datetime64[ns]"))
+    df.insert(KlineColumns.COLUMNS.index("number_of_trades") - 1, "number_of_trades", trades)
+    df.index = pd.DatetimeIndex(close_time.astype("datetime64[ms]").astype("datetime64[ns]"), name="close_time")
+    return df
+
+
+def widen(values):
+    """float64 values of a float32 column at their shortest decimal form (82.52135, not 82.52135467529297)."""
+    if values.dtype == np.float64:
+        return values
+    return values.astype(str).astype(np.float64)
+
+
+def _read_only(view):
+    view.flags.writeable = False
+    return view
+
+
+class KlineRingBuffer:
+    """Fixed-capacity rolling window of klines stored column-wise in NumPy arrays.
+
+    Prices and volumes are kept as `dtype`; float32 halves their memory and
+    keeps ~7 significant digits, plenty for the strategy's comparisons.
+    """
+
+    def __init__(self, capacity=1000, dtype=np.float64):
+        self.capacity = capacity
+        self.open_time = np.zeros(capacity, dtype=np.int64)
+        self.close_time = np.zeros(capacity, dtype=np.int64)
+        self.number_of_trades = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(KlineColumns.FLOAT_COLUMNS)), dtype=dtype)
+        self.size = 0
+        self._end = 0  # Next slot to write
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_open_time(self):
+        return int(self.open_time[(self._end - 1) % self.capacity]) if self.size else None
+
+    def last_closed_open_time(self, now_ms=None):
+        """Open time of the newest candle whose close time has passed, or None."""
+        now_ms = now_ms or int(time.time() * 1000)
+        slots = self._ordered_slots()
+        closed = slots[self.close_time[slots] < now_ms]
+        return int(self.open_time[closed[-1]]) if len(closed) else None
+
+    def clear(self):
+        self.size = 0
+        self._end = 0
+
+    def extend(self, rows):
+        """Append raw kline rows; a row with the last open_time replaces the still-forming candle."""
+        if not len(rows):
+            return
+        self.extend_columns(*parse_kline_rows(rows))
+
+    def extend_columns(self, open_time, close_time, trades, values):
+        """Append candles given as parsed columns (see parse_kline_payload)."""
+        # Skip candles we already hold, and overwrite the last one if it was revised
+        last_open_time = self.last_open_time
+        if last_open_time is not None:
+            keep = open_time >= last_open_time
+            open_time, close_time, trades, values = open_time[keep], close_time[keep], trades[keep], values[keep]
+            if len(open_time) and open_time[0] == last_open_time:
+                self._end = (self._end - 1) % self.capacity
+                self.size -= 1
+
+        # Only the newest `capacity` rows can survive
+        open_time, close_time = open_time[-self.capacity:], close_time[-self.capacity:]
+        trades, values = trades[-self.capacity:], values[-self.capacity:]
+
+        slots = (self._end + np.arange(len(open_time))) % self.capacity
+        self.open_time[slots] = open_time
+        self.close_time[slots] = close_time
+        self.number_of_trades[slots] = trades
+        self.values[slots] = values
+        self._end = (self._end + len(open_time)) % self.capacity
+        self.size = min(self.size + len(open_time), self.capacity)
+
+    def _ordered_slots(self):
+        return (self._end - self.size + np.arange(self.size)) % self.capacity
+
+    @staticmethod
+    def column_index(col):
+        return KlineColumns.FLOAT_COLUMNS.index(col)
+
+    def since(self, open_time=None):
+        """Return (open_time, close_time, values) for the candles opened at or after `open_time`.
+
+        Unless the range wraps around the end of the buffer these are read-only
+        views, only valid until the buffer is extended again.
+        """
+        slots = self._ordered_slots()
+        if open_time is not None:
+            slots = slots[np.searchsorted(self.open_time[slots], open_time):]
+        if len(slots) and slots[-1] - slots[0] == len(slots) - 1:
+            window = slice(slots[0], slots[-1] + 1)
+            return tuple(_read_only(column[window]) for column in (self.open_time, self.close_time, self.values))
+        return self.open_time[slots], self.close_time[slots], self.values[slots]
+
+    def to_dataframe(self):
+        """Materialize the buffer in the same shape as BinanceKlines.convert_data_to_dataframe."""
+        slots = self._ordered_slots()
+        return build_klines_frame(self.open_time[slots], self.close_time[slots],
+                                  self.number_of_trades[slots], self.values[slots])
+
+
+class KlineCache:
+    """Rolling kline buffers per (symbol, interval), seeded once then refreshed with delta fetches."""
+
+    def __init__(self, capacity=1000, dtype=None):
+        self.capacity = capacity
+        # LOW_MEMORY stores prices and volumes as float32
+        self.dtype = np.dtype(dtype or (np.float32 if config.LOW_MEMORY else np.float64))
+        self._buffers = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Call listener(symbol, interval, rows) with every batch of raw rows applied.
+
+        Seeding parses the response bytes straight into the buffer: listeners then
+        get rows=None and must rebuild whatever they derive from the rows.
+        """
+        self._listeners.append(listener)
+
+    def apply(self, symbol, interval, rows):
+        """Apply raw kline rows (e.g. from a stream) to an existing buffer."""
+        buffer = self._buffers.get((symbol, interval))
+        if buffer is not None:
+            with STAGE_SECONDS.time(stage="parse", symbol=symbol):
+                buffer.extend(rows)
+            with STAGE_SECONDS.time(stage="listeners", symbol=symbol):
+                for listener in self._listeners:
+                    listener(symbol, interval, rows)
+        return buffer
+
+    def get(self, symbol, interval):
+        return self._buffers.get((symbol, interval))
+
+    def buffers(self):
+        """All buffers keyed by (symbol, interval), e.g. for snapshots."""
+        return dict(self._buffers)
+
+    def restore(self, buffers):
+        """Reuse buffers from a snapshot; the next refresh only fetches the gap."""
+        self._buffers.update(
+            (key, buffer) for key, buffer in buffers.items()
+            if buffer.capacity == self.capacity and buffer.values.dtype == self.dtype
+        )
+
+    def _missing_candles(self, buffer, interval):
+        # Candles from the last cached one (included, it may still be forming) up to now
+        interval_ms = KlineIntervals.to_milliseconds(interval)
+        now_ms = int(time.time() * 1000)
+        return (now_ms - buffer.last_open_time) // interval_ms + 1
+
+    async def refresh(self, client, symbol, interval):
+        """Bring the buffer for a symbol up to date and return it."""
+        key = (symbol, interval)
+        buffer = self._buffers.get(key)
+
+        if buffer is not None and len(buffer):
+            missing = self._missing_candles(buffer, interval)
+            if missing < self.capacity:
+                # One extra candle of slack for clock skew with the exchange
+                limit = max(missing + 1, 2)
+                rows = await client.get_klines(symbol, interval, limit=limit, start_time=buffer.last_open_time)
+                self.apply(symbol, interval, rows)
+                # A full page means our clock is behind the exchange's: keep paging
+                while len(rows) == limit and limit < self.capacity:
+                    limit = self.capacity
+                    rows = await client.get_klines(symbol, interval, limit=limit, start_time=buffer.last_open_time)
+                    self.apply(symbol, interval, rows)
+                return buffer
+            logger.info(f"Cache for {symbol} {interval} is {missing} candles behind, reseeding")
+
+        # Full pages (seed and reseed) skip response.json(): the byte parser fills the buffer
+        payload = await client.get_klines_payload(symbol, interval, limit=self.capacity)
+        buffer = self._buffers[key] = KlineRingBuffer(self.capacity, self.dtype)
+        with STAGE_SECONDS.time(stage="parse", symbol=symbol):
+            buffer.extend_columns(*parse_kline_payload(payload))
+        for listener in self._listeners:
+            listener(symbol, interval, None)
+        return buffer
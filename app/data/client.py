@@ -0,0 +1,247 @@
+import asyncio
+import functools
+import time
+import httpx
+from loguru import logger
+from app import config
+from app.data.exceptions import BinanceAPIError
+from app.metrics import (BINANCE_COALESCED, BINANCE_CONCURRENCY, BINANCE_REQUESTS, BINANCE_THROTTLED_SECONDS,
+                         BINANCE_USED_WEIGHT, STAGE_SECONDS)
+
+# 429: over the request weight limit; 418: IP banned for repeating it
+RATE_LIMIT_STATUSES = (429, 418)
+
+
+def kline_weight(limit):
+    """Request weight of GET /api/v3/klines, by limit (a conservative estimate)."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def used_weight(headers):
+    """Weight used by our IP in the current minute (X-MBX-USED-WEIGHT-1M), or None."""
+    value = headers.get("X-MBX-USED-WEIGHT-1M")
+    return int(value) if value is not None and value.isdigit() else None
+
+
+def retry_after(headers, now=None):
+    """Seconds to wait after a 429/418: Retry-After, or until the next minute when it is missing."""
+    value = headers.get("Retry-After")
+    if value is not None and value.isdigit():
+        return float(value)
+    now = time.time() if now is None else now
+    return 60 - now % 60 + 1
+
+
+class WeightBudget:
+    """Request weight of the current minute, shared by every request of a client.
+
+    The used weight comes from the X-MBX-USED-WEIGHT-1M header of each response
+    (the exchange's count for our IP, so other processes are included) plus an
+    estimate for the requests in flight. A request waits while it would take the
+    minute over `budget`, and every request waits out the Retry-After of a 429/418.
+    Concurrency grows by one per response while less than half of the budget is
+    used and halves when more than 80% is used or after a 429/418.
+    """
+
+    def __init__(self, budget=None, max_concurrency=None):
+        self.budget = budget or config.BINANCE_WEIGHT_BUDGET
+        self.max_concurrency = max_concurrency or config.FETCH_CONCURRENCY
+        self.concurrency = self.max_concurrency
+        self.used = 0
+        self.minute = None
+        self.pending = 0
+        self.active = 0
+        self.paused_until = 0.0
+        self._condition = None
+
+    @property
+    def condition(self):
+        # Created lazily so it is bound to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _roll(self, now):
+        # Binance counts the weight per clock minute
+        minute = int(now // 60)
+        if minute != self.minute:
+            self.minute, self.used = minute, 0
+
+    def _wait(self, weight, now):
+        """Seconds before a request of `weight` may go (<= 0: now), None to wait for a release."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.active >= self.concurrency:
+            return None
+        # A request heavier than the whole budget still goes, alone in a fresh minute
+        if self.used + self.pending + weight > self.budget and self.used + self.pending > 0:
+            # Responses in flight may show less weight than estimated; otherwise wait for the next minute
+            return None if self.active else 60 - now % 60
+        return 0
+
+    async def acquire(self, weight):
+        started = time.time()
+        while True:
+            async with self.condition:
+                now = time.time()
+                self._roll(now)
+                wait = self._wait(weight, now)
+                if wait is None:
+                    await self.condition.wait()
+                    continue
+                if wait <= 0:
+                    self.active += 1
+                    self.pending += weight
+                    break
+            # Timed waits (pause, next minute) sleep outside the lock: wait_for() around
+            # Condition.wait() can swallow a cancellation and hang aclose()
+            await asyncio.sleep(wait)
+        waited = time.time() - started
+        if waited > 0.001:
+            BINANCE_THROTTLED_SECONDS.inc(waited)
+
+    async def release(self, weight, used=None, pause=None):
+        """Account for a finished request: `used` from its header, `pause` from a 429/418."""
+        async with self.condition:
+            now = time.time()
+            self._roll(now)
+            self.active -= 1
+            self.pending -= weight
+            self.used = used if used is not None else self.used + weight
+            if pause is not None:
+                self.paused_until = max(self.paused_until, now + pause)
+                self.concurrency = max(1, self.concurrency // 2)
+            elif self.used > 0.8 * self.budget:
+                self.concurrency = max(1, self.concurrency // 2)
+            elif self.used < 0.5 * self.budget:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            BINANCE_CONCURRENCY.set(self.concurrency)
+            self.condition.notify_all()
+
+
+class AsyncBinanceClient:
+    """Async Binance REST client reusing a pool of keep-alive HTTP/1.1 connections.
+
+    Requests are throttled by a WeightBudget, retried after a 429/418 once its
+    Retry-After has passed, and identical klines requests in flight are sent once.
+    """
+
+    KLINES_PATH = "/api/v3/klines"
+
+    def __init__(self, base_url=None, api_key=None, max_connections=None, timeout=None, weight_budget=None):
+        self.base_url = base_url or config.BINANCE_BASE_URL
+        self.api_key = api_key or config.BINANCE_API_KEY
+        self.max_connections = max_connections or config.FETCH_CONCURRENCY
+        self.timeout = timeout or config.BINANCE_TIMEOUT
+        self.weight = WeightBudget(weight_budget, self.max_connections)
+        self._client = None
+        self._in_flight = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    @property
+    def client(self):
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None or self._client.is_closed:
+            headers = {"X-MBX-APIKEY": self.api_key} if self.api_key else {}
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60,
+            )
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, headers=headers, limits=limits, timeout=self.timeout
+            )
+            logger.info(f"Opened Binance connection pool: {self.base_url} (max {self.max_connections})")
+        return self._client
+
+    async def _request_klines(self, symbol, interval, limit, start_time, end_time):
+        params = {"symbol": symbol, "interval": interval.lower(), "limit": limit}
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        if end_time is not None:
+            params["endTime"] = int(end_time)
+
+        # Identical requests (same symbol, interval and range) share the call already in flight
+        key = tuple(params.items())
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._send(symbol, params, kline_weight(limit)))
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        else:
+            BINANCE_COALESCED.inc()
+        # Shielded: a caller giving up must not cancel the request for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # Retrieved here too in case every caller gave up
+            task.exception()
+
+    async def _send(self, symbol, params, weight):
+        for attempt in range(config.BINANCE_MAX_RETRIES + 1):
+            await self.weight.acquire(weight)
+            used = pause = None
+            try:
+                with STAGE_SECONDS.time(stage="fetch", symbol=symbol):
+                    response = await self.client.get(self.KLINES_PATH, params=params)
+                BINANCE_REQUESTS.inc(status=response.status_code)
+                used = used_weight(response.headers)
+                if used is not None:
+                    BINANCE_USED_WEIGHT.set(used)
+                if response.status_code in RATE_LIMIT_STATUSES:
+                    pause = retry_after(response.headers)
+            except httpx.HTTPError as e:
+                BINANCE_REQUESTS.inc(status="error")
+                raise BinanceAPIError(f"Binance API error: {str(e)}")
+            finally:
+                await self.weight.release(weight, used, pause)
+
+            if pause is None:
+                break
+            logger.warning(f"Binance answered {response.status_code} for {symbol}, "
+                           f"pausing requests for {pause:g}s (attempt {attempt + 1})")
+
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise BinanceAPIError(f"Binance API error: {str(e)}")
+        return response
+
+    async def get_klines(self, symbol, interval, limit=1000, start_time=None, end_time=None, allow_empty=False):
+        """Fetch raw klines for a symbol as returned by the Binance API."""
+        response = await self._request_klines(symbol, interval, limit, start_time, end_time)
+        with STAGE_SECONDS.time(stage="decode", symbol=symbol):
+            klines = response.json()
+
+        if not klines and not allow_empty:
+            raise BinanceAPIError("No klines data returned")
+        return klines
+
+    async def get_klines_payload(self, symbol, interval, limit=1000, start_time=None, end_time=None,
+                                 allow_empty=False):
+        """Fetch klines as the undecoded response body, for cache.parse_kline_payload."""
+        response = await self._request_klines(symbol, interval, limit, start_time, end_time)
+        payload = response.content
+        if payload.strip() == b"[]" and not allow_empty:
+            raise BinanceAPIError("No klines data returned")
+        return payload
+
+    async def aclose(self):
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
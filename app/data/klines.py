@@ -1,7 +1,12 @@
 import os
+import time
 from dotenv import load_dotenv
+from app.config import BINANCE_BASE_URL, BINANCE_MAX_RETRIES
+from app.data.cache import build_klines_frame, parse_kline_payload
+from app.data.client import RATE_LIMIT_STATUSES, AsyncBinanceClient, retry_after
 from app.data.exceptions import BinanceAPIError
-from app.data.schemas import KlineColumns
+from app.data.schemas import KlineColumns, KlineIntervals
+from app.data.store import download_klines
 import pandas as pd
 import requests
 from loguru import logger
@@ -22,25 +27,57 @@ class BinanceKlines:
         self.data = self.fetch_data_from_binance()
         return self.convert_data_to_dataframe() if self.data else None
 
+    async def fetch_and_wrangle_klines_from_store(self, client, store, limit=1000):
+        """Serve the last `limit` klines from a KlineStore, fetching only the missing tail over REST.
+
+        The store is append-only: when it starts too late to hold `limit` candles,
+        they are fetched over REST instead.
+        """
+        interval = self.interval.lower()
+        start_time = int(time.time() * 1000) - limit * KlineIntervals.to_milliseconds(interval)
+        logger.info(f"Loading klines from store: {self.symbol}, {interval}")
+
+        # Closed candles go to the store; the forming one is only part of this answer
+        forming = await download_klines(client, store, self.symbol, interval, start_time)
+        stored = store.read(self.symbol, interval, limit=limit)
+        if len(stored) + len(forming[0]) < limit:
+            payload = await client.get_klines_payload(self.symbol, interval, limit=limit, allow_empty=True)
+            return build_klines_frame(*parse_kline_payload(payload))
+        if not len(forming[0]):
+            return stored
+        return pd.concat([stored, build_klines_frame(*forming)]).iloc[-limit:]
+
     def fetch_data_from_binance(self):
-        base_url = "https://api.binance.com/api/v3/klines"
+        base_url = f"{BINANCE_BASE_URL}{AsyncBinanceClient.KLINES_PATH}"
         params = {"symbol": self.symbol, "interval": self.interval.lower(), "limit": 1000}
         headers = {"X-MBX-APIKEY": self.api_key}
 
         try:
             response = requests.get(base_url, params=params, headers=headers)
+            # Rate limited (429) or banned (418): wait as long as Binance asks, then retry
+            for attempt in range(BINANCE_MAX_RETRIES):
+                if response.status_code not in RATE_LIMIT_STATUSES:
+                    break
+                pause = retry_after(response.headers)
+                logger.warning(f"Binance answered {response.status_code} for {self.symbol}, retrying in {pause:g}s")
+                time.sleep(pause)
+                response = requests.get(base_url, params=params, headers=headers)
             response.raise_for_status()
-            klines = response.json()
 
-            if not klines:
+            # Keep the raw body: convert_data_to_dataframe parses it without json decoding
+            if response.content.strip() == b"[]":
                 raise BinanceAPIError("No klines data returned")
-            return klines
+            return response.content
         except requests.exceptions.RequestException as e:
             raise BinanceAPIError(f"Binance API error: {str(e)}")
 
 
     def convert_data_to_dataframe(self):
         try:
+            # Raw response bodies are decoded straight into typed columns
+            if isinstance(self.data, (bytes, bytearray)):
+                return build_klines_frame(*parse_kline_payload(self.data))
+
             df = pd.DataFrame(self.data, columns=KlineColumns.COLUMNS)
             
             # Check if 'close_time' exists before proceeding
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import bisect
+import json
+import math
+import random
+import time
+import zlib
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlparse
+import websockets
+from loguru import logger
+from app.data.client import kline_weight
+from app.data.schemas import KlineIntervals
+from app.data.synthetic import synthetic_klines
+
+
+class KlineReplay:
+    """Replays kline histories on an accelerated clock, in the Binance REST and stream formats.
+
+    The first `warmup` candles of every history are already closed when the
+    replay starts; the remaining ones close one by one, every
+    interval / `speed` seconds.
+
+    It also mocks Binance's rate limiting (`weight_limit`), network delay
+    (`latency`) and server errors (a share `error_rate` of requests answer 500);
+    GET /stats counts the requests served and rejected.
+    """
+
+    def __init__(self, histories, interval="5m", speed=1.0, warmup=1000, weight_limit=None, latency=0.0,
+                 error_rate=0.0, seed=0):
+        self.histories = histories
+        self.interval = interval
+        self.interval_ms = KlineIntervals.to_milliseconds(interval)
+        self.speed = speed
+        self.warmup = warmup
+        self.length = min(len(rows) for rows in histories.values())
+        self.started_at = time.time()
+        # Request weight accounting like Binance's: per clock minute, 429 above the limit,
+        # 418 (a temporary ban) for clients that keep sending after a 429
+        self.weight_limit = weight_limit
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.minute = None
+        self.used_weight = 0
+        self.violations = 0
+        self.banned_until = 0.0
+        self.stats = {"requests": 0, "429": 0, "418": 0, "500": 0}
+
+    @classmethod
+    def synthetic(cls, symbols, interval="5m", candles=2000, **kwargs):
+        """Random-walk histories whose live part starts now."""
+        interval_ms = KlineIntervals.to_milliseconds(interval)
+        warmup = kwargs.get("warmup", 1000)
+        start_time = int(time.time() * 1000) // interval_ms * interval_ms - warmup * interval_ms
+        histories = {
+            symbol: synthetic_klines(candles, seed=zlib.crc32(symbol.encode()), interval_ms=interval_ms,
+                                     start_time=start_time)
+            for symbol in symbols
+        }
+        return cls(histories, interval, **kwargs)
+
+    def closed_candles(self):
+        """Number of candles closed so far on the replay clock."""
+        elapsed_ms = (time.time() - self.started_at) * 1000 * self.speed
+        return min(self.warmup + int(elapsed_ms // self.interval_ms), self.length)
+
+    def wall_time_of_close(self, index):
+        """Wall-clock time at which candle `index` closes."""
+        return self.started_at + (index + 1 - self.warmup) * self.interval_ms / 1000 / self.speed
+
+    def klines(self, symbol, limit=500, start_time=None, end_time=None):
+        """Rows visible on the replay clock, including the forming candle, like GET /api/v3/klines."""
+        rows = self.histories[symbol]
+        end = min(self.closed_candles() + 1, self.length)
+        if start_time is not None:
+            begin = bisect.bisect_left(rows, start_time, 0, end, key=lambda row: row[0])
+            rows = rows[begin:min(begin + limit, end)]
+        else:
+            rows = rows[max(0, end - limit):end]
+        if end_time is not None:
+            rows = [row for row in rows if row[0] <= end_time]
+        return rows
+
+    def stream_event(self, symbol, index, closed):
+        row = self.histories[symbol][index]
+        return json.dumps({
+            "stream": f"{symbol.lower()}@kline_{self.interval}",
+            "data": {
+                "e": "kline", "E": int(time.time() * 1000), "s": symbol,
+                "k": {
+                    "t": row[0], "T": row[6], "s": symbol, "i": self.interval,
+                    "o": row[1], "h": row[2], "l": row[3], "c": row[4], "v": row[5],
+                    "n": row[8], "x": closed, "q": row[7], "V": row[9], "Q": row[10], "B": row[11],
+                },
+            },
+        })
+
+    def charge(self, weight, now=None):
+        """Count a request of `weight`; returns (status, Retry-After or None)."""
+        now = time.time() if now is None else now
+        minute = int(now // 60)
+        if minute != self.minute:
+            self.minute, self.used_weight, self.violations = minute, 0, 0
+        if now < self.banned_until:
+            return HTTPStatus.IM_A_TEAPOT, math.ceil(self.banned_until - now)
+        self.used_weight += weight
+        if self.weight_limit is None or self.used_weight <= self.weight_limit:
+            return HTTPStatus.OK, None
+        self.violations += 1
+        if self.violations > 10:
+            self.banned_until = now + 120
+            return HTTPStatus.IM_A_TEAPOT, 120
+        return HTTPStatus.TOO_MANY_REQUESTS, math.ceil(60 - now % 60)
+
+    async def process_request(self, path, request_headers):
+        """Serve REST klines on the same port; websocket upgrades fall through."""
+        url = urlparse(path)
+        if url.path == "/stats":
+            return HTTPStatus.OK, [("Content-Type", "application/json")], json.dumps(self.stats).encode()
+        if url.path != "/api/v3/klines":
+            return None
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        limit = int(query.get("limit", 500))
+        self.stats["requests"] += 1
+        status, wait = self.charge(kline_weight(limit))
+        headers = [("Content-Type", "application/json"), ("X-MBX-USED-WEIGHT-1M", str(self.used_weight))]
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if wait is not None:
+            self.stats[str(status.value)] += 1
+            body = json.dumps({"code": -1003, "msg": "Too many requests."}).encode()
+            return status, headers + [("Retry-After", str(wait))], body
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["500"] += 1
+            body = json.dumps({"code": -1000, "msg": "An unknown error occurred while processing the request."})
+            return HTTPStatus.INTERNAL_SERVER_ERROR, headers, body.encode()
+
+        symbol = query.get("symbol")
+        if symbol not in self.histories:
+            body = json.dumps({"code": -1121, "msg": "Invalid symbol."}).encode()
+            return HTTPStatus.BAD_REQUEST, headers, body
+        rows = self.klines(
+            symbol,
+            limit=limit,
+            start_time=int(query["startTime"]) if "startTime" in query else None,
+            end_time=int(query["endTime"]) if "endTime" in query else None,
+        )
+        return HTTPStatus.OK, headers, json.dumps(rows).encode()
+
+    async def stream(self, websocket):
+        """Send an update halfway through every candle and a closed event when it closes."""
+        streams = parse_qs(urlparse(websocket.path).query).get("streams", [""])[0].split("/")
+        symbols = [s.split("@")[0].upper() for s in streams if s.split("@")[0].upper() in self.histories]
+        logger.info(f"Replay client subscribed to {len(symbols)} symbols")
+
+        index = self.closed_candles()
+        while index < self.length:
+            close_at = self.wall_time_of_close(index)
+            half_candle = self.interval_ms / 2000 / self.speed
+            await asyncio.sleep(max(0.0, close_at - half_candle - time.time()))
+            for symbol in symbols:
+                await websocket.send(self.stream_event(symbol, index, closed=False))
+            await asyncio.sleep(max(0.0, close_at - time.time()))
+            for symbol in symbols:
+                await websocket.send(self.stream_event(symbol, index, closed=True))
+            index += 1
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        async with websockets.serve(self.stream, host, port, process_request=self.process_request):
+            logger.info(f"Replaying {len(self.histories)} symbols on ws://{host}:{port} at {self.speed}x")
+            await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Binance kline replay (REST + combined streams)")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT", "ETHUSDT"])
+    parser.add_argument("--interval", default="5m")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay clock speed-up")
+    parser.add_argument("--candles", type=int, default=2000)
+    parser.add_argument("--history", help="JSON file of recorded klines: {symbol: [rows]}")
+    parser.add_argument("--weight-limit", type=int, help="Answer 429/418 above this request weight per minute")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every REST response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of REST requests answering 500")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.history:
+        with open(args.history) as f:
+            replay = KlineReplay(json.load(f), args.interval, speed=args.speed, weight_limit=args.weight_limit,
+                                 latency=args.latency, error_rate=args.error_rate)
+    else:
+        replay = KlineReplay.synthetic(args.symbols, args.interval, args.candles, speed=args.speed,
+                                       weight_limit=args.weight_limit, latency=args.latency,
+                                       error_rate=args.error_rate)
+    asyncio.run(replay.serve(args.host, args.port))
@@ -0,0 +1,156 @@
+import time
+from decimal import Decimal
+from loguru import logger
+from app.data.schemas import KlineIntervals
+
+# Binance weekly candles open on Monday 00:00 UTC; the epoch was a Thursday
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def _sum(values):
+    """Exact decimal sum, formatted with the precision of the inputs."""
+    decimals = [Decimal(v) for v in values]
+    total = sum(decimals, Decimal(0))
+    return str(total.quantize(Decimal(1).scaleb(min(d.as_tuple().exponent for d in decimals))))
+
+
+class CandleAggregator:
+    """Builds higher-interval kline rows from base-interval rows, exactly like the exchange.
+
+    Prices are picked from the base candles and volumes are summed as decimals,
+    so derived candles match exchange candles field for field. A derived candle
+    is closed once the last base candle of its period is reported closed
+    (close_through), or when base candles of a later period arrive.
+    """
+
+    def __init__(self, base_interval, target_interval):
+        self.base_ms = KlineIntervals.to_milliseconds(base_interval)
+        self.target_ms = KlineIntervals.to_milliseconds(target_interval)
+        if self.target_ms <= self.base_ms or self.target_ms % self.base_ms:
+            raise ValueError(f"Cannot derive {target_interval} candles from {base_interval} candles")
+        self.offset = WEEK_OFFSET_MS if target_interval == "1w" else 0
+        self.bucket = None   # open_time of the derived candle being built
+        self.rows = {}       # its base rows by open_time
+        self.closed = False
+
+    def bucket_of(self, open_time):
+        return open_time - (open_time - self.offset) % self.target_ms
+
+    def aggregate(self):
+        rows = [self.rows[t] for t in sorted(self.rows)]
+        return [
+            self.bucket, rows[0][1],
+            max((row[2] for row in rows), key=Decimal),
+            min((row[3] for row in rows), key=Decimal),
+            rows[-1][4], _sum(row[5] for row in rows), self.bucket + self.target_ms - 1,
+            _sum(row[7] for row in rows), sum(int(row[8]) for row in rows),
+            _sum(row[9] for row in rows), _sum(row[10] for row in rows), "0",
+        ]
+
+    def close_through(self, open_time):
+        """Close the current period if its last base candle (opened at or before `open_time`) has closed.
+
+        Returns the closed derived row, or None.
+        """
+        last_open_time = self.bucket + self.target_ms - self.base_ms
+        if self.closed or not self.rows or open_time < last_open_time:
+            return None
+        self.closed = True
+        return self.aggregate()
+
+    def update(self, rows):
+        """Apply base rows (revisions allowed) and return [(derived_row, just_closed), ...]."""
+        updates = []
+        for row in rows:
+            open_time = int(row[0])
+            bucket = self.bucket_of(open_time)
+            if self.bucket is not None and bucket < self.bucket:
+                continue
+            if bucket != self.bucket:
+                if self.rows and not self.closed:
+                    # The exchange moved on: the previous period is over even with missing base candles
+                    updates.append((self.aggregate(), True))
+                self.bucket, self.rows, self.closed = bucket, {}, False
+            self.rows[open_time] = row
+
+        if self.rows and rows and not self.closed:
+            updates.append((self.aggregate(), False))
+        return updates
+
+
+class TimeframeResampler:
+    """Derives higher intervals for the symbols of a KlineCache from its base interval.
+
+    Derived buffers are seeded once over REST and then only extended locally
+    from the base candles the cache receives.
+    """
+
+    def __init__(self, cache, base_interval, intervals):
+        self.cache = cache
+        self.base_interval = base_interval
+        self.intervals = [interval for interval in intervals if interval != base_interval]
+        self._aggregators = {}
+        self._closed = {}
+        cache.add_listener(self.on_rows)
+
+    async def ensure(self, client, symbol):
+        """Seed the derived buffers of a symbol and prime its aggregators (once)."""
+        for interval in self.intervals:
+            if (symbol, interval) in self._aggregators:
+                continue
+            await self.cache.refresh(client, symbol, interval)
+            aggregator = CandleAggregator(self.base_interval, interval)
+            # Rebuild the current period from its base candles
+            bucket = aggregator.bucket_of(int(time.time() * 1000))
+            rows = await self._base_rows_since(client, symbol, bucket, aggregator.base_ms)
+            # Earlier periods are already complete in the seeded buffer
+            aggregator.bucket = bucket
+            self._aggregators[(symbol, interval)] = aggregator
+            self._apply(symbol, interval, aggregator.update(rows))
+            logger.info(f"Deriving {symbol} {interval} candles from {self.base_interval}")
+
+    async def _base_rows_since(self, client, symbol, start_time, base_ms, page_size=1000):
+        """Every base candle from `start_time` on, paged: a period can hold more than one page (1d of 1m)."""
+        rows = []
+        while True:
+            page = await client.get_klines(symbol, self.base_interval, limit=page_size, start_time=start_time,
+                                           allow_empty=True)
+            rows += page
+            if len(page) < page_size:
+                return rows
+            start_time = int(page[-1][0]) + base_ms
+
+    def on_rows(self, symbol, interval, rows):
+        if interval != self.base_interval:
+            return
+        if rows is None:
+            # The base buffer was reseeded after a long gap: ensure() rebuilds the aggregators
+            for target in self.intervals:
+                self._aggregators.pop((symbol, target), None)
+            return
+        for target in self.intervals:
+            aggregator = self._aggregators.get((symbol, target))
+            if aggregator is not None:
+                self._apply(symbol, target, aggregator.update(rows))
+
+    def _apply(self, symbol, interval, updates):
+        if not updates:
+            return
+        self.cache.get(symbol, interval).extend([row for row, _ in updates])
+        for row, just_closed in updates:
+            if just_closed:
+                self._closed.setdefault(symbol, []).append((interval, row[0]))
+
+    def pop_closed(self, symbol, upto=None):
+        """[(interval, open_time), ...] of derived candles that closed since the last call.
+
+        `upto` is the open time of the newest closed base candle: the period it
+        ends is closed without consulting the local clock.
+        """
+        if upto is not None:
+            for interval in self.intervals:
+                aggregator = self._aggregators.get((symbol, interval))
+                row = aggregator.close_through(upto) if aggregator is not None else None
+                if row is not None:
+                    self._apply(symbol, interval, [(row, True)])
+        return self._closed.pop(symbol, [])
@@ -6,6 +6,29 @@ class KlineColumns:
         "quote_asset_volume", "number_of_trades", "taker_buy_base_asset_volume",
         "taker_buy_quote_asset_volume", "ignored"
     ]
+    FLOAT_COLUMNS = [
+        "open_price", "high_price", "low_price", "close_price", "volume", "quote_asset_volume",
+        "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume"
+    ]
+
+
+class KlineIntervals:
+    """Binance kline intervals and their length in milliseconds."""
+    MILLISECONDS = {
+        "1s": 1_000,
+        "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+        "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+        "8h": 28_800_000, "12h": 43_200_000,
+        "1d": 86_400_000, "3d": 259_200_000, "1w": 604_800_000,
+    }
+
+    @classmethod
+    def to_milliseconds(cls, interval):
+        """Return the interval length in ms (monthly candles have no fixed length)."""
+        try:
+            return cls.MILLISECONDS[interval]
+        except KeyError:
+            raise ValueError(f"Unsupported kline interval: {interval}")
 
 # Define an Enum for Valid Binance Trading Pairs with USDT
 class CryptoPair(Enum):
@@ -1,23 +1,143 @@
+import asyncio
+import time
+import httpx
 from loguru import logger
-from dotenv import load_dotenv
-import os
-import requests
-
-load_dotenv()
-# Access environment variables
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-CHANNEL_ID = os.getenv("CHANNEL_ID")
-logger.info(f"BOT_TOKEN: {BOT_TOKEN}, CHANNEL_ID: {CHANNEL_ID}")
-
-def send_telegram_message(TEST_MESSAGE):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {
-        'chat_id': CHANNEL_ID,
-        'text': TEST_MESSAGE
-    }
-    response = requests.post(url, json=payload)
-
-    if response.status_code == 200:
-        logger.info("Message sent successfully!")
-    else:
-        logger.error(f"Failed to send message: {response.status_code}, {response.text}")
+from app import config
+from app.metrics import TELEGRAM_MESSAGES, TELEGRAM_RETRIES, TELEGRAM_SECONDS
+
+
+def _retry_after(response):
+    """Seconds a 429 asks to wait: `parameters.retry_after` of the body, else the Retry-After header, else 1."""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return 1.0
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self):
+        """Seconds until a token is available (0 if one is available now)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while (wait := self.delay()) > 0:
+            await asyncio.sleep(wait)
+        self.tokens -= 1
+
+
+class TelegramNotifier:
+    """Background Telegram delivery: callers enqueue, a single worker sends in order.
+
+    Sending is rate limited per chat and globally. Network errors, server errors
+    and 429s are retried up to `max_retries` times: 429s after their `retry_after`,
+    the others with exponential backoff.
+    """
+
+    def __init__(self, bot_token=None, chat_id=None, api_url=None, queue_size=None, max_retries=None,
+                 global_rate=None, chat_rate_per_minute=None):
+        self.bot_token = bot_token or config.BOT_TOKEN
+        self.chat_id = chat_id or config.CHANNEL_ID
+        self.api_url = api_url or config.TELEGRAM_API_URL
+        self.max_retries = config.TELEGRAM_MAX_RETRIES if max_retries is None else max_retries
+        self.queue = asyncio.Queue(maxsize=queue_size or config.TELEGRAM_QUEUE_SIZE)
+        self.global_bucket = TokenBucket(global_rate or config.TELEGRAM_GLOBAL_RATE,
+                                         capacity=global_rate or config.TELEGRAM_GLOBAL_RATE)
+        self.chat_rate = (chat_rate_per_minute or config.TELEGRAM_CHAT_RATE_PER_MINUTE) / 60
+        self.chat_buckets = {}
+        self._client = None
+        self._worker = None
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._client = httpx.AsyncClient(base_url=self.api_url, timeout=10)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10):
+        """Deliver what is still queued (up to `timeout` seconds), then stop the worker."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self.queue.qsize()} undelivered Telegram messages")
+        self._worker.cancel()
+        self._worker = None
+        await self._client.aclose()
+
+    def send(self, text, chat_id=None):
+        """Queue a message without waiting for delivery; returns False if the queue is full."""
+        try:
+            self.queue.put_nowait((chat_id or self.chat_id, text))
+            return True
+        except asyncio.QueueFull:
+            TELEGRAM_MESSAGES.inc(result="dropped")
+            logger.error(f"Telegram queue full, dropping message: {text[:50]!r}")
+            return False
+
+    async def _run(self):
+        while True:
+            chat_id, text = await self.queue.get()
+            try:
+                await self._deliver(chat_id, text)
+            except Exception as e:
+                TELEGRAM_MESSAGES.inc(result="failed")
+                logger.error(f"Failed to send message: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, chat_id, text):
+        bucket = self.chat_buckets.setdefault(chat_id, TokenBucket(self.chat_rate))
+        payload = {'chat_id': chat_id, 'text': text}
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            retry_after = None
+            try:
+                with TELEGRAM_SECONDS.time():
+                    response = await self._client.post(f"/bot{self.bot_token}/sendMessage", json=payload)
+            except httpx.HTTPError as e:
+                response, error = None, str(e)
+
+            if response is not None:
+                if response.status_code == 200:
+                    TELEGRAM_MESSAGES.inc(result="sent")
+                    logger.info("Message sent successfully!")
+                    return
+                error = f"{response.status_code}, {response.text}"
+                if response.status_code == 429:
+                    # Flood control: wait as long as Telegram asks
+                    retry_after = _retry_after(response)
+                elif response.status_code < 500:
+                    TELEGRAM_MESSAGES.inc(result="failed")
+                    logger.error(f"Failed to send message: {error}")
+                    return
+
+            attempt += 1
+            if attempt > self.max_retries:
+                TELEGRAM_MESSAGES.inc(result="failed")
+                logger.error(f"Failed to send message after {self.max_retries} retries: {error}")
+                return
+            if retry_after is not None:
+                backoff = retry_after
+                TELEGRAM_RETRIES.inc(reason="rate_limit")
+            else:
+                backoff = min(2 ** (attempt - 1), 60)
+                TELEGRAM_RETRIES.inc(reason="error")
+            logger.warning(f"Failed to send message ({error}), retry {attempt} in {backoff:g}s")
+            await asyncio.sleep(backoff)
@@ -0,0 +1,55 @@
+import os
+import pickle
+import time
+from loguru import logger
+from app import config
+
+SNAPSHOT_VERSION = 2
+
+
+class SnapshotStore:
+    """Atomic binary (pickle) snapshots of the monitoring state on local disk."""
+
+    def __init__(self, path=None):
+        self.path = path or config.SNAPSHOT_PATH
+
+    @staticmethod
+    def dumps(state):
+        """Serialize the state; call from the event loop so it is consistent."""
+        return pickle.dumps({"version": SNAPSHOT_VERSION, "created": time.time(), "state": state},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    def write(self, payload):
+        """Write a serialized snapshot atomically (safe to run in a worker thread)."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def save(self, state):
+        payload = self.dumps(state)
+        self.write(payload)
+        return len(payload)
+
+    def load(self):
+        """Return the saved state, or None if there is no usable snapshot."""
+        try:
+            with open(self.path, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable snapshot {self.path}: {str(e)}")
+            return None
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.warning(f"Ignoring snapshot version {snapshot.get('version')} (expected {SNAPSHOT_VERSION})")
+            return None
+        age = time.time() - snapshot["created"]
+        logger.info(f"Loaded snapshot from {self.path} taken {age:.0f}s ago")
+        return snapshot["state"]
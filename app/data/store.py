@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from loguru import logger
+from app import config
+from app.data.cache import build_klines_frame, parse_kline_payload, parse_kline_rows
+from app.data.schemas import KlineColumns, KlineIntervals
+
+PAGE_LIMIT = 1000
+
+# On-disk dtype of every stored column
+COLUMN_DTYPES = {
+    "open_time": np.int64,
+    "close_time": np.int64,
+    "number_of_trades": np.int64,
+    **{col: np.float64 for col in KlineColumns.FLOAT_COLUMNS},
+}
+
+
+def _to_ms(value):
+    """Milliseconds since the epoch from an int (ms), a datetime or a date string."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+class KlineStore:
+    """Append-only columnar kline store with one raw NumPy file per column.
+
+    Layout: <root>/<SYMBOL>/<interval>/<column>.bin plus meta.json holding the
+    number of committed rows. Columns are appended first and meta.json is
+    replaced atomically afterwards, so an interrupted append is rolled back
+    (truncated) the next time the series is written.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or config.KLINE_STORE_DIR
+
+    def _path(self, symbol, interval, name=""):
+        return os.path.join(self.root, symbol.upper(), interval, name)
+
+    def rows(self, symbol, interval):
+        try:
+            with open(self._path(symbol, interval, "meta.json")) as f:
+                return json.load(f)["rows"]
+        except FileNotFoundError:
+            return 0
+
+    def _column(self, symbol, interval, col, rows):
+        """Read-only memory map of a column (nothing is loaded until sliced)."""
+        if not rows:
+            return np.empty(0, dtype=COLUMN_DTYPES[col])
+        return np.memmap(self._path(symbol, interval, f"{col}.bin"), dtype=COLUMN_DTYPES[col], mode="r",
+                         shape=(rows,))
+
+    def last_open_time(self, symbol, interval):
+        rows = self.rows(symbol, interval)
+        return int(self._column(symbol, interval, "open_time", rows)[-1]) if rows else None
+
+    def append(self, symbol, interval, klines):
+        """Append closed raw kline rows; candles not newer than the stored ones are skipped."""
+        if not len(klines):
+            return 0
+        return self.append_columns(symbol, interval, *parse_kline_rows(klines))
+
+    def append_columns(self, symbol, interval, open_time, close_time, trades, values):
+        """Append closed candles given as parsed columns (see cache.parse_kline_payload)."""
+        last_open_time = self.last_open_time(symbol, interval)
+        if last_open_time is not None:
+            keep = open_time > last_open_time
+            open_time, close_time, trades, values = open_time[keep], close_time[keep], trades[keep], values[keep]
+        if not len(open_time):
+            return 0
+
+        columns = {"open_time": open_time, "close_time": close_time, "number_of_trades": trades}
+        for i, col in enumerate(KlineColumns.FLOAT_COLUMNS):
+            columns[col] = values[:, i]
+
+        os.makedirs(self._path(symbol, interval), exist_ok=True)
+        rows = self.rows(symbol, interval)
+        for col, data in columns.items():
+            with open(self._path(symbol, interval, f"{col}.bin"), "ab") as f:
+                # Drop whatever an interrupted append left behind
+                f.truncate(rows * np.dtype(COLUMN_DTYPES[col]).itemsize)
+                f.write(np.ascontiguousarray(data, dtype=COLUMN_DTYPES[col]).tobytes())
+
+        meta_path = self._path(symbol, interval, "meta.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"rows": rows + len(open_time)}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        return len(open_time)
+
+    def read(self, symbol, interval, start=None, end=None, limit=None):
+        """Candles with start <= open_time <= end as a klines frame, reading only that range.
+
+        With `limit` only the last `limit` candles of the range are returned.
+        """
+        rows = self.rows(symbol, interval)
+        open_times = self._column(symbol, interval, "open_time", rows)
+        first = 0 if start is None else int(np.searchsorted(open_times, _to_ms(start), side="left"))
+        last = rows if end is None else int(np.searchsorted(open_times, _to_ms(end), side="right"))
+        if limit is not None:
+            first = max(first, last - limit)
+
+        col = lambda name: np.array(self._column(symbol, interval, name, rows)[first:last])
+        values = np.column_stack([col(name) for name in KlineColumns.FLOAT_COLUMNS]) if last > first \
+            else np.empty((0, len(KlineColumns.FLOAT_COLUMNS)))
+        return build_klines_frame(col("open_time"), col("close_time"), col("number_of_trades"), values)
+
+
+async def download_klines(client, store, symbol, interval, start_time, end_time=None, concurrency=5):
+    """Page through history into the store, resuming where it left off.
+
+    A series already in the store is always continued right after its last
+    candle, even when that is before `start_time`, so it never has holes.
+    Pages of 1000 candles are fetched `concurrency` at a time, parsed straight
+    from the response bytes and committed batch by batch. Returns the candles
+    that were still forming (not stored) as (open_time, close_time, trades, values).
+    """
+    interval_ms = KlineIntervals.to_milliseconds(interval)
+    now_ms = int(time.time() * 1000)
+    end_time = min(_to_ms(end_time) or now_ms, now_ms)
+    start_time = _to_ms(start_time)
+    last_open_time = store.last_open_time(symbol, interval)
+    if last_open_time is not None:
+        start_time = last_open_time + interval_ms
+
+    page_ms = PAGE_LIMIT * interval_ms
+    page_starts = list(range(start_time, end_time + 1, page_ms))
+    forming = parse_kline_payload(b"[]")
+    for i in range(0, len(page_starts), concurrency):
+        batch = page_starts[i:i + concurrency]
+        pages = await asyncio.gather(*(
+            client.get_klines_payload(symbol, interval, limit=PAGE_LIMIT, start_time=start,
+                                      end_time=min(start + page_ms - 1, end_time), allow_empty=True)
+            for start in batch
+        ))
+        columns = [np.concatenate(parts) for parts in zip(*(parse_kline_payload(page) for page in pages))]
+        closed = columns[1] < now_ms
+        stored = store.append_columns(symbol, interval, *(column[closed] for column in columns))
+        forming = tuple(column[~closed] for column in columns)
+        logger.info(f"Stored {stored} {symbol} {interval} candles ({i + len(batch)}/{len(page_starts)} pages)")
+    return forming
+
+
+async def download_symbols(client, store, symbols, interval, start_time, end_time=None, concurrency=5):
+    """Bulk download several symbols, one after another, each with concurrent pages."""
+    for symbol in symbols:
+        await download_klines(client, store, symbol, interval, start_time, end_time, concurrency)
+
+
+if __name__ == "__main__":
+    from app.data.client import AsyncBinanceClient
+
+    parser = argparse.ArgumentParser(description="Download Binance kline history into the local store")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--interval", default="5m")
+    parser.add_argument("--start", required=True, help="e.g. 2023-01-01")
+    parser.add_argument("--end", help="Defaults to now")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--root", default=None, help=f"Defaults to {config.KLINE_STORE_DIR}")
+    args = parser.parse_args()
+
+    async def main():
+        async with AsyncBinanceClient(max_connections=args.concurrency) as client:
+            await download_symbols(client, KlineStore(args.root), args.symbols, args.interval,
+                                   args.start, args.end, args.concurrency)
+
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+import websockets
+from loguru import logger
+from app import config
+from app.data.exceptions import BinanceAPIError
+from app.metrics import STREAM_RECONNECTS
+
+
+def kline_event_to_row(kline):
+    """Convert the `k` object of a kline stream event into a REST-style kline row."""
+    return [
+        kline["t"], kline["o"], kline["h"], kline["l"], kline["c"], kline["v"],
+        kline["T"], kline["q"], kline["n"], kline["V"], kline["Q"], kline["B"],
+    ]
+
+
+class KlineStream:
+    """Combined Binance kline streams feeding a KlineCache and reporting closed candles.
+
+    Symbols are multiplexed over as few connections as possible. After every
+    (re)connection the cache is backfilled over REST, so candles that closed
+    while disconnected still reach the indicators on the next close.
+    `on_candle_closed(symbol, buffer, open_time)` gets the open time of the
+    candle the exchange marked closed.
+    """
+
+    def __init__(self, symbols, interval, cache, client, on_candle_closed,
+                 url=None, symbols_per_connection=None, backfill_concurrency=None):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.cache = cache
+        self.client = client
+        self.on_candle_closed = on_candle_closed
+        self.url = url or config.BINANCE_WS_URL
+        self.symbols_per_connection = symbols_per_connection or config.STREAM_SYMBOLS_PER_CONNECTION
+        self._backfill_semaphore = asyncio.Semaphore(backfill_concurrency or config.FETCH_CONCURRENCY)
+
+    def stream_url(self, symbols):
+        streams = "/".join(f"{symbol.lower()}@kline_{self.interval}" for symbol in symbols)
+        return f"{self.url}/stream?streams={streams}"
+
+    async def run(self):
+        """Listen to all symbols until cancelled."""
+        chunks = [self.symbols[i:i + self.symbols_per_connection]
+                  for i in range(0, len(self.symbols), self.symbols_per_connection)]
+        await asyncio.gather(*(self._run_connection(chunk) for chunk in chunks))
+
+    async def _run_connection(self, symbols):
+        backoff = 1
+        while True:
+            try:
+                async with websockets.connect(self.stream_url(symbols), max_queue=None) as ws:
+                    logger.info(f"Kline stream connected for {len(symbols)} symbols")
+                    await self._backfill(symbols)
+                    backoff = 1
+                    async for message in ws:
+                        await self._handle_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                STREAM_RECONNECTS.inc()
+                logger.warning(f"Kline stream disconnected ({str(e)}), reconnecting in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    async def _backfill(self, symbols):
+        """Fetch the candles missed while disconnected (or seed the cache on first connect)."""
+        async def backfill_symbol(symbol):
+            async with self._backfill_semaphore:
+                try:
+                    await self.cache.refresh(self.client, symbol, self.interval)
+                except BinanceAPIError as e:
+                    # E.g. a delisted pair: the other symbols of the connection keep streaming
+                    logger.error(f"Backfill failed for {symbol}: {str(e)}")
+
+        await asyncio.gather(*(backfill_symbol(symbol) for symbol in symbols))
+
+    async def _handle_message(self, message):
+        event = json.loads(message).get("data", {})
+        kline = event.get("k")
+        if event.get("e") != "kline" or kline is None:
+            return
+
+        buffer = self.cache.apply(kline["s"], self.interval, [kline_event_to_row(kline)])
+        if buffer is None:
+            return
+
+        if kline["x"]:
+            latency = time.time() - kline["T"] / 1000
+            logger.debug(f"Candle closed for {kline['s']} ({latency * 1000:.0f} ms after close)")
+            # The exchange says it closed: don't second-guess it with the local clock
+            await self._notify(kline["s"], buffer, kline["t"])
+
+    async def _notify(self, symbol, buffer, closed_open_time):
+        try:
+            await self.on_candle_closed(symbol, buffer, closed_open_time)
+        except Exception as e:
+            logger.error(f"Error checking closed candle for {symbol}: {str(e)}")
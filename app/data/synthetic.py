@@ -0,0 +1,31 @@
+import numpy as np
+
+FIVE_MINUTES_MS = 300_000
+START_TIME_MS = 1_700_000_100_000 - 1_700_000_100_000 % FIVE_MINUTES_MS
+
+
+def synthetic_klines(rows=1000, seed=0, interval_ms=FIVE_MINUTES_MS, start_time=START_TIME_MS):
+    """Deterministic random-walk klines shaped like the Binance /api/v3/klines JSON arrays."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, rows)))
+    open_ = np.concatenate([close[:1], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.random(rows) * 0.002)
+    low = np.minimum(open_, close) * (1 - rng.random(rows) * 0.002)
+    volume = rng.gamma(2.0, 50.0, rows)
+    trades = rng.integers(10, 5000, rows)
+    taker = rng.random(rows)
+
+    klines = []
+    for i in range(rows):
+        open_time = start_time + i * interval_ms
+        klines.append([
+            open_time, f"{open_[i]:.8f}", f"{high[i]:.8f}", f"{low[i]:.8f}", f"{close[i]:.8f}",
+            f"{volume[i]:.8f}", open_time + interval_ms - 1, f"{volume[i] * close[i]:.8f}", int(trades[i]),
+            f"{volume[i] * taker[i]:.8f}", f"{volume[i] * taker[i] * close[i]:.8f}", "0",
+        ])
+    return klines
+
+
+def simulated_symbols(count):
+    """Names of the synthetic symbols served by the simulator: SIM0000USDT, SIM0001USDT, ..."""
+    return [f"SIM{i:04d}USDT" for i in range(count)]
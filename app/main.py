@@ -1,33 +1,26 @@
 import uvicorn
-from fastapi import FastAPI
-from app.data.klines import BinanceKlines  # Your Binance data handler
-from app.strategies.indicators import get_opportunity  # Import the updated strategy logic
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from app.data.client import AsyncBinanceClient  # Your Binance data handler
+from app.data.stream import KlineStream
+from app.data.send_telegram_data import TelegramNotifier
+from app.data.snapshot import SnapshotStore
+from app import metrics
+from app.monitor import SymbolMonitor
+from app.profiler import MIN_INTERVAL, SamplingProfiler
+from app.read_model import ReadModel
+from app.scheduler import MonitorHealth, ShardedScheduler, run_candle_cycles
 from pydantic import BaseModel
 import asyncio
 from loguru import logger
-from dotenv import load_dotenv
-import os
-import requests
+from app.config import BOT_TOKEN, CHANNEL_ID, FETCH_CONCURRENCY, INGESTION_MODE, KLINE_INTERVAL, SCHEDULER_WORKERS, SNAPSHOT_INTERVAL
 
-# Load environment variables (Telegram bot settings)
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
-BOT_TOKEN = os.getenv('BOT_TOKEN')
-CHANNEL_ID = os.getenv('CHANNEL_ID')
-logger.info(f"BOT_TOKEN: {BOT_TOKEN}, CHANNEL_ID: {CHANNEL_ID}")
+# Background Telegram delivery (rate limited, retried, one pooled connection)
+telegram_notifier = TelegramNotifier(BOT_TOKEN, CHANNEL_ID)
 
-# Async function to send Telegram notifications
+# Queue a Telegram notification; delivery never blocks strategy evaluation
 async def send_telegram_message(TEST_MESSAGE):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {
-        'chat_id': CHANNEL_ID,
-        'text': TEST_MESSAGE
-    }
-    response = requests.post(url, json=payload)
-
-    if response.status_code == 200:
-        logger.info("Message sent successfully!")
-    else:
-        logger.error(f"Failed to send message: {response.status_code}, {response.text}")
+    telegram_notifier.send(TEST_MESSAGE)
 
 app = FastAPI()
 
@@ -42,71 +35,111 @@ class ResultOrder(BaseModel):
 # Store active signals
 signals = {}
 
-# Function to fetch data for a symbol and check for trading opportunities
-async def fetch_and_check_opportunity(symbol: str):
-    try:
-        interval = "5m"
-        logger.info(f"Fetching data for {symbol}...")
+# Signals, latest indicators and recent decisions as served by the read API
+read_model = ReadModel()
+
+# Shared Binance client (one keep-alive connection pool for all symbols)
+binance_client = AsyncBinanceClient(max_connections=FETCH_CONCURRENCY)
 
-        # Fetch the Kline data
-        klines_instance = BinanceKlines(symbol, interval)
-        data = klines_instance.fetch_and_wrangle_klines()
+# Function to act on the opportunity of a symbol's latest candle; the single owner of `signals`
+async def handle_opportunity(symbol, close_time, close_price, opportunity, indicators=None):
+    read_model.record(symbol, close_time, close_price, opportunity, indicators)
 
-        # Apply the enhanced strategy to detect opportunities
-        close_time, close_price, opportunity = get_opportunity(data)
-        logger.info(f"Opportunity detected: {opportunity} for {symbol}.")
+    # Buy Opportunity detected
+    if opportunity == "Buy" and symbol not in signals:
+        signals[symbol] = {
+            "buy_price": close_price,
+            "buy_time": close_time
+        }
 
-        # Buy Opportunity detected
-        if opportunity == "Buy" and symbol not in signals:
-            signals[symbol] = {
-                "buy_price": close_price,
-                "buy_time": close_time
-            }
+        # Send the buy opportunity message to Telegram
+        message = (
+            f"🚀 Buy Opportunity for {symbol}!\n"
+            f"💰 Price: {signals[symbol]['buy_price']}\n"
+            f"⏰ Time: {signals[symbol]['buy_time']}\n"
+            f"🔔 Stay tuned for more opportunities!"
+        )
+        await send_telegram_message(message)
 
-            # Send the buy opportunity message to Telegram
+    # Sell Opportunity detected
+    elif opportunity == "Sell" and symbol in signals:
+        buy_price = signals[symbol]['buy_price']
+        sell_price = close_price
+
+        # Only sell if the sell price is higher than the buy price
+        if sell_price > buy_price:
+            profit = sell_price - buy_price
+
+            # Update the signal with sell information
+            signals[symbol].update({
+                "sell_price": sell_price,
+                "sell_time": close_time,
+                "profit": profit
+            })
+
+            logger.info(f"Sell opportunity for {symbol}. Profit: {profit}")
+
+            # Send sell opportunity message to Telegram
             message = (
-                f"🚀 Buy Opportunity for {symbol}!\n"
-                f"💰 Price: {signals[symbol]['buy_price']}\n"
-                f"⏰ Time: {signals[symbol]['buy_time']}\n"
+                f"🚀 Sell Opportunity for {symbol}!\n"
+                f"💰 Buy Price: {buy_price}\n"
+                f"💰 Sell Price: {sell_price}\n"
+                f"💰 Profit: {profit}\n"
+                f"⏰ Buy Time: {signals[symbol]['buy_time']}\n"
+                f"⏰ Sell Time: {close_time}\n"
                 f"🔔 Stay tuned for more opportunities!"
             )
             await send_telegram_message(message)
 
-        # Sell Opportunity detected
-        elif opportunity == "Sell" and symbol in signals:
-            buy_price = signals[symbol]['buy_price']
-            sell_price = close_price
-
-            # Only sell if the sell price is higher than the buy price
-            if sell_price > buy_price:
-                profit = sell_price - buy_price
-
-                # Update the signal with sell information
-                signals[symbol].update({
-                    "sell_price": sell_price,
-                    "sell_time": close_time,
-                    "profit": profit
-                })
-
-                logger.info(f"Sell opportunity for {symbol}. Profit: {profit}")
-
-                # Send sell opportunity message to Telegram
-                message = (
-                    f"🚀 Sell Opportunity for {symbol}!\n"
-                    f"💰 Buy Price: {buy_price}\n"
-                    f"💰 Sell Price: {sell_price}\n"
-                    f"💰 Profit: {profit}\n"
-                    f"⏰ Buy Time: {signals[symbol]['buy_time']}\n"
-                    f"⏰ Sell Time: {close_time}\n"
-                    f"🔔 Stay tuned for more opportunities!"
-                )
-                await send_telegram_message(message)
+            # Remove the signal after selling
+            del signals[symbol]
 
-                # Remove the signal after selling
-                del signals[symbol]
+        else:
+            logger.info(f"Sell signal detected but sell price {sell_price} is not greater than buy price {buy_price}.")
 
-            else:
-                logger.info(f"Sell signal detected but sell price {sell_price} is not greater than buy price {buy_price}.")
+# Rolling kline buffers, derived timeframes and incremental indicator state per (symbol, interval)
+monitor = SymbolMonitor(binance_client, handle_opportunity)
+kline_cache = monitor.cache
+indicator_engines = monitor.engines
+
+# Periodic snapshots of the buffers, indicator state and signals for warm restarts
+snapshot_store = SnapshotStore()
+
+def snapshot_state():
+    return {
+        "buffers": kline_cache.buffers(),
+        "engines": indicator_engines,
+        "signals": signals,
+    }
+
+def save_snapshot():
+    size = snapshot_store.save(snapshot_state())
+    logger.info(f"Saved snapshot ({size / 1e6:.1f} MB)")
+
+def load_snapshot():
+    state = snapshot_store.load()
+    if state:
+        monitor.restore(state)
+        signals.update(state["signals"])
+        logger.info(f"Restored {len(state['buffers'])} kline buffers and {len(state['signals'])} active signals")
+
+async def snapshot_periodically():
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            # Serialize on the event loop for a consistent state, write to disk off it
+            payload = snapshot_store.dumps(snapshot_state())
+            await asyncio.to_thread(snapshot_store.write, payload)
+        except Exception as e:
+            logger.error(f"Failed to save snapshot: {str(e)}")
+
+# Function to fetch data for a symbol and check for trading opportunities
+async def fetch_and_check_opportunity(symbol: str):
+    try:
+        logger.info(f"Fetching data for {symbol}...")
+
+        # Fetch the new Kline data and check every strategy interval
+        await monitor.fetch_and_check(symbol)
 
     except Exception as e:
         logger.error(f"Error fetching data for {symbol}: {str(e)}")
@@ -132,21 +165,139 @@ def display_signals():
     else:
         logger.info("No active signals at the moment.")
 
+# Readiness and liveness of the monitoring loop, served on /health
+health = MonitorHealth()
+
+# Background tasks running the monitoring loop and the periodic snapshots
+monitoring_task = None
+snapshot_task = None
+
+def cycle_finished(report):
+    health.cycle_finished(report)
+    read_model.publish(signals)
+    # display signals
+    display_signals()
+
 # Function to fetch opportunities for multiple symbols
-async def fetch_opportunities_for_symbols(symbols):
-    while True:
-        for symbol in symbols:
-            await fetch_and_check_opportunity(symbol)
-        # display signals 
-        display_signals()
+async def fetch_opportunities_for_symbols(symbols, concurrency=FETCH_CONCURRENCY):
+    # Check all symbols concurrently, at most `concurrency` at a time, right after every candle close
+    await run_candle_cycles(symbols, fetch_and_check_opportunity, concurrency=concurrency, on_cycle=cycle_finished)
+
+# Function to check symbols the moment their candle closes on the kline streams
+async def stream_opportunities_for_symbols(symbols):
+    async def on_candle_closed(symbol, buffer, closed_open_time):
+        health.ready = True
+        health.beat()
+        await monitor.check_timeframes(symbol, buffer, closed_open_time)
+
+    stream = KlineStream(symbols, KLINE_INTERVAL, kline_cache, binance_client, on_candle_closed)
+    await asyncio.gather(stream.run(), read_model.publish_when_changed(signals))
+
+# Function to spread the symbols over worker processes; decisions come back to handle_opportunity
+async def shard_opportunities_for_symbols(symbols):
+    async def on_decision(*decision):
+        health.ready = True
+        health.beat()
+        await handle_opportunity(*decision)
+
+    async def display_periodically():
+        while True:
+            await asyncio.sleep(61)
+            display_signals()
+
+    scheduler = ShardedScheduler(symbols, SCHEDULER_WORKERS, on_decision)
+    await asyncio.gather(scheduler.run(), display_periodically(), read_model.publish_when_changed(signals))
+
+# Function to run the monitoring loop for the configured ingestion mode
+async def monitor_symbols(symbols):
+    if SCHEDULER_WORKERS > 0:
+        await shard_opportunities_for_symbols(symbols)
+    elif INGESTION_MODE == "websocket":
+        await stream_opportunities_for_symbols(symbols)
+    else:
+        await fetch_opportunities_for_symbols(symbols)
+
+def monitoring_stopped(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Monitoring stopped: {str(task.exception())}")
+
+
+# Liveness: the monitoring task is running and still checking symbols
+@app.get("/health/live")
+async def health_live():
+    alive = monitoring_task is not None and not monitoring_task.done() and health.alive()
+    return JSONResponse(health.report(), status_code=200 if alive else 503)
+
+# Readiness: every symbol has been checked at least once
+@app.get("/health/ready")
+async def health_ready():
+    return JSONResponse(health.report(), status_code=200 if health.ready else 503)
+
+
+# Read API for dashboards: served from the snapshot published once per cycle, so reads never
+# recompute indicators or call Binance. Bodies are pre-serialized and revalidated with ETags.
+def snapshot_response(request, resource):
+    etags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if resource.etag in etags or "*" in etags:
+        return Response(status_code=304, headers={"ETag": resource.etag})
+    return Response(resource.body, media_type="application/json",
+                    headers={"ETag": resource.etag, "Cache-Control": "no-cache"})
 
-        # Wait for 5 minutes before checking again
-        await asyncio.sleep(61)
+# Active signals of every symbol
+@app.get("/api/signals")
+async def get_signals(request: Request):
+    return snapshot_response(request, read_model.snapshot.signals)
+
+# Latest decision, indicator values and signal of every symbol, or of ?symbols=BTCUSDT,ETHUSDT
+@app.get("/api/symbols")
+async def get_symbols(request: Request, symbols: str = None):
+    snapshot = read_model.snapshot
+    if not symbols:
+        return snapshot_response(request, snapshot.all_symbols)
+    return snapshot_response(request, snapshot.bulk(s.strip().upper() for s in symbols.split(",")))
+
+@app.get("/api/symbols/{symbol}")
+async def get_symbol(request: Request, symbol: str):
+    resource = read_model.snapshot.symbols.get(symbol.upper())
+    if resource is None:
+        return JSONResponse({"detail": f"Unknown symbol: {symbol}"}, status_code=404)
+    return snapshot_response(request, resource)
+
+# Most recent decisions, oldest first
+@app.get("/api/decisions")
+async def get_decisions(request: Request, limit: int = 100):
+    return snapshot_response(request, read_model.snapshot.recent_decisions(max(limit, 0)))
+
+
+# Prometheus metrics: per-stage timings, cycle durations, candle lag, errors, retries and queue depths
+@app.get("/metrics")
+async def get_metrics():
+    metrics.QUEUE_DEPTH.set(telegram_notifier.queue.qsize(), queue="telegram")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Sampling profiler of the event loop, switched on and off at runtime
+profiler = SamplingProfiler()
+
+@app.post("/debug/profiler/start")
+async def start_profiler(interval: float = Query(0.005, gt=0)):
+    profiler.start(interval)
+    return {"running": True, "interval": max(interval, MIN_INTERVAL)}
+
+# Returns the collapsed stacks sampled so far (flamegraph.pl / speedscope format)
+@app.post("/debug/profiler/stop")
+async def stop_profiler():
+    profiler.stop()
+    return PlainTextResponse(profiler.collapsed())
+
+@app.get("/debug/profiler")
+async def get_profile():
+    return PlainTextResponse(profiler.collapsed())
 
 
 # FastAPI startup event to start monitoring
 @app.on_event("startup")
 async def startup_event():
+    global monitoring_task, snapshot_task
     symbols = [
         "BTCUSDT",  # Bitcoin
         "ETHUSDT",  # Ethereum
@@ -161,11 +312,31 @@ async def startup_event():
     ]
 
     
-    logger.info("Starting monitoring for symbols...")
-    logger.info(f"BOT_TOKEN: {BOT_TOKEN}, CHANNEL_ID: {CHANNEL_ID}")
+    telegram_notifier.start()
+    load_snapshot()
+    read_model.publish(signals)
+    snapshot_task = asyncio.create_task(snapshot_periodically())
+
+    logger.info(f"Starting monitoring for symbols, alerts go to channel {CHANNEL_ID}...")
+
+    # Start fetching opportunities in the background so the server can answer requests
+    monitoring_task = asyncio.create_task(monitor_symbols(symbols))
+    monitoring_task.add_done_callback(monitoring_stopped)
 
-    # Start fetching opportunities
-    await fetch_opportunities_for_symbols(symbols)
+
+# Stop monitoring, save a final snapshot, flush pending notifications and close the connection pools on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in (monitoring_task, snapshot_task):
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    try:
+        save_snapshot()
+    except Exception as e:
+        logger.error(f"Failed to save snapshot: {str(e)}")
+    await telegram_notifier.stop()
+    await binance_client.aclose()
 
 # Main entry point to run the FastAPI server
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+import bisect
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Every metric registers itself here; render() writes them all
+REGISTRY = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self._samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution of observations, e.g. durations in seconds."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        counts = self._values.get(key)
+        if counts is None:
+            # One count per bucket plus +Inf, then the sum
+            counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a with-block (also around awaits)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        for key, counts in self._values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, counts[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# Pipeline
+STAGE_SECONDS = Histogram(
+    "alerts_stage_seconds", "Time spent per pipeline stage and symbol", ["stage", "symbol"])
+CYCLE_SECONDS = Histogram(
+    "alerts_cycle_seconds", "Duration of a polling cycle over all symbols")
+CANDLE_CLOSE_LAG_SECONDS = Histogram(
+    "alerts_candle_close_lag_seconds", "Delay between a candle close and its evaluation", ["interval"])
+LATE_SYMBOLS = Counter(
+    "alerts_late_symbols_total", "Symbols cancelled for missing the cycle deadline")
+DECISIONS = Counter(
+    "alerts_decisions_total", "Evaluated candles by interval and opportunity", ["interval", "opportunity"])
+
+# Binance
+BINANCE_REQUESTS = Counter(
+    "binance_requests_total", "Binance REST responses by status code ('error' for transport errors)", ["status"])
+BINANCE_USED_WEIGHT = Gauge(
+    "binance_used_weight_1m", "Request weight used in the current minute (X-MBX-USED-WEIGHT-1M)")
+BINANCE_CONCURRENCY = Gauge(
+    "binance_concurrency", "Requests the weight budget currently lets run at the same time")
+BINANCE_THROTTLED_SECONDS = Counter(
+    "binance_throttled_seconds_total", "Time requests waited for the weight budget or a Retry-After")
+BINANCE_COALESCED = Counter(
+    "binance_coalesced_requests_total", "Requests answered by an identical request already in flight")
+STREAM_RECONNECTS = Counter(
+    "binance_stream_reconnects_total", "Kline stream disconnections")
+
+# Telegram
+TELEGRAM_SECONDS = Histogram(
+    "telegram_send_seconds", "Duration of a sendMessage request")
+TELEGRAM_MESSAGES = Counter(
+    "telegram_messages_total", "Telegram messages by outcome", ["result"])
+TELEGRAM_RETRIES = Counter(
+    "telegram_retries_total", "Telegram delivery retries by reason", ["reason"])
+QUEUE_DEPTH = Gauge(
+    "alerts_queue_depth", "Items waiting in a queue", ["queue"])
@@ -0,0 +1,96 @@
+import time
+import pandas as pd
+from loguru import logger
+from app import config
+from app.data.cache import KlineCache
+from app.data.resample import TimeframeResampler
+from app.metrics import CANDLE_CLOSE_LAG_SECONDS, DECISIONS, STAGE_SECONDS
+from app.strategies.features import FeatureGraph
+from app.strategies.indicators import format_close_time
+from app.strategies.registry import evaluate_strategies, load_strategies
+from app.strategies.streaming import IndicatorEngine
+
+
+class SymbolMonitor:
+    """Kline buffers, derived timeframes and indicator state for a set of symbols.
+
+    Every evaluated candle is handed to `on_decision(symbol, close_time,
+    close_price, opportunity, indicators)`, which owns what happens next
+    (signals, notifications, the read API). Symbols of derived intervals are labelled "SYMBOL interval".
+
+    Registered `strategies` (STRATEGIES_FILE by default) run next to the
+    enhanced strategy on one memoized feature graph per symbol and candle,
+    labelled "SYMBOL strategy".
+    """
+
+    def __init__(self, client, on_decision, interval=None, intervals=None, capacity=1000, strategies=None):
+        self.client = client
+        self.on_decision = on_decision
+        self.interval = interval or config.KLINE_INTERVAL
+        self.intervals = intervals or config.STRATEGY_INTERVALS
+        self.cache = KlineCache(capacity=capacity)
+        self.resampler = TimeframeResampler(self.cache, self.interval, self.intervals)
+        self.engines = {}
+        self.strategies = load_strategies() if strategies is None else strategies
+
+    async def fetch_and_check(self, symbol):
+        """Fetch the new candles of a symbol and check every strategy interval."""
+        buffer = await self.cache.refresh(self.client, symbol, self.interval)
+        # Polled candles are closed once their close time has passed on the local clock
+        await self.check_timeframes(symbol, buffer, buffer.last_closed_open_time())
+
+    async def check_timeframes(self, symbol, buffer, upto=None):
+        """Check every strategy interval of a symbol after new base candles arrived.
+
+        Only closed candles are evaluated, up to the one opened at `upto` (the
+        candle a stream just reported closed); the one still forming is left out.
+        """
+        if self.interval in self.intervals and upto is not None:
+            await self.check(symbol, buffer, upto=upto)
+
+        # Derived intervals are only evaluated once their candle has closed
+        await self.resampler.ensure(self.client, symbol)
+        for interval, open_time in self.resampler.pop_closed(symbol, upto):
+            await self.check(symbol, self.cache.get(symbol, interval), interval, upto=open_time)
+
+    async def check(self, symbol, buffer, interval=None, upto=None):
+        """Feed the new candles of a buffer to its indicator engine and report the opportunity."""
+        interval = interval or self.interval
+        engine = self.engines.setdefault((symbol, interval), IndicatorEngine())
+        with STAGE_SECONDS.time(stage="indicators", symbol=symbol):
+            engine.sync(buffer, upto)
+        with STAGE_SECONDS.time(stage="rules", symbol=symbol):
+            close_time, close_price, opportunity = engine.get_opportunity()
+        CANDLE_CLOSE_LAG_SECONDS.observe(time.time() - (engine.last_close_time + 1) / 1000, interval=interval)
+        DECISIONS.inc(interval=interval, opportunity=opportunity)
+
+        # Signals of derived intervals are tracked separately, e.g. "BTCUSDT 1h"
+        label = symbol if interval == self.interval else f"{symbol} {interval}"
+        logger.info(f"Opportunity detected: {opportunity} for {label}.")
+        with STAGE_SECONDS.time(stage="decision", symbol=label):
+            await self.on_decision(label, close_time, close_price, opportunity, engine.values())
+
+        if self.strategies:
+            await self.check_strategies(symbol, buffer, interval, label, upto)
+
+    async def check_strategies(self, symbol, buffer, interval, label, upto=None):
+        """Evaluate the registered strategies on the features of the same candles."""
+        with STAGE_SECONDS.time(stage="features", symbol=symbol):
+            # One graph per evaluated candle, shared by every strategy and dropped afterwards
+            graph = FeatureGraph.from_buffer(buffer, upto)
+            if not len(graph):
+                return
+            opportunities = evaluate_strategies(graph, self.strategies)
+        close_time = format_close_time(pd.Timestamp(int(graph.close_time[-1]), unit="ms", tz="UTC"))
+        close_price = float(graph["close_price"][-1])
+        for name, opportunity in opportunities.items():
+            DECISIONS.inc(interval=interval, opportunity=opportunity[-1])
+            with STAGE_SECONDS.time(stage="decision", symbol=symbol):
+                await self.on_decision(f"{label} {name}", close_time, close_price, opportunity[-1])
+
+    def state(self):
+        return {"buffers": self.cache.buffers(), "engines": self.engines}
+
+    def restore(self, state):
+        self.cache.restore(state["buffers"])
+        self.engines.update(state["engines"])
@@ -0,0 +1,63 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+# Shortest sampling interval: below it the sampling thread would hog the GIL
+MIN_INTERVAL = 0.001
+
+
+class SamplingProfiler:
+    """Samples the call stack of one thread at a fixed interval, e.g. the event loop.
+
+    Stacks are counted in the collapsed format ("outer;inner count" per line)
+    read by flamegraph.pl and speedscope. Overhead is a stack walk per sample
+    on a background thread, so it can be left running for a while in production.
+    """
+
+    def __init__(self):
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.started = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.005, thread_id=None):
+        """Start sampling `thread_id` (the calling thread by default) every `interval` seconds."""
+        if self.running:
+            return
+        interval = max(interval, MIN_INTERVAL)
+        self.stacks.clear()
+        self.samples = 0
+        self.started = time.time()
+        self._stop.clear()
+        target = thread_id or threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, args=(target, interval), name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self, thread_id, interval):
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
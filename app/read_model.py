@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import deque
+from app import config
+
+
+def _json_safe(value):
+    # NaN (indicators still warming up) is not valid JSON
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    return value
+
+
+def dumps(value):
+    return json.dumps(_json_safe(value), separators=(",", ":"), allow_nan=False, default=float).encode()
+
+
+class Resource:
+    """Pre-serialized JSON body and its ETag (a hash of the body, stable while the content is)."""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+class ReadSnapshot:
+    """Immutable view of the monitoring state as served by the read API."""
+
+    def __init__(self, created, signals, symbols, decisions):
+        self.created = created
+        # Bulk and decision bodies built for a request, reused for the same query until the next snapshot
+        self._queries = {}
+        self.signals = Resource(dumps(signals))
+        self.symbols = {symbol: Resource(dumps(state)) for symbol, state in symbols.items()}
+        self.all_symbols = self.bulk(self.symbols)
+        # Newest last, each serialized once
+        self.decisions = [dumps(decision) for decision in decisions]
+
+    def _query(self, key, build):
+        resource = self._queries.get(key)
+        if resource is None:
+            if len(self._queries) >= 1024:
+                self._queries.clear()
+            resource = self._queries[key] = Resource(build())
+        return resource
+
+    def bulk(self, symbols):
+        """{symbol: state} for several symbols, joined from their serialized states."""
+        symbols = tuple(symbol for symbol in symbols if symbol in self.symbols)
+        return self._query(("symbols", symbols), lambda: b"{" + b",".join(
+            json.dumps(symbol).encode() + b":" + self.symbols[symbol].body for symbol in symbols) + b"}")
+
+    def recent_decisions(self, limit):
+        return self._query(("decisions", limit),
+                           lambda: b"[" + b",".join(self.decisions[-limit:] if limit else []) + b"]")
+
+
+class ReadModel:
+    """In-memory state for dashboards: signals, latest indicators and recent decisions.
+
+    Decisions are recorded as they happen, but readers only ever see the last
+    published ReadSnapshot, rebuilt once per cycle (or shortly after new
+    decisions, see publish_when_changed). Reads never recompute anything.
+    """
+
+    def __init__(self, max_decisions=None):
+        self.latest = {}
+        self.decisions = deque(maxlen=max_decisions or config.READ_MODEL_DECISIONS)
+        self.changed = False
+        self.snapshot = ReadSnapshot(time.time(), {}, {}, [])
+
+    def record(self, symbol, close_time, close_price, opportunity, indicators=None):
+        decision = {"symbol": symbol, "close_time": close_time, "close_price": close_price,
+                    "opportunity": opportunity}
+        self.decisions.append(decision)
+        self.latest[symbol] = {"decision": decision, "indicators": indicators}
+        self.changed = True
+
+    def publish(self, signals):
+        """Swap in a new snapshot of `signals` and the recorded decisions."""
+        # Symbols with a signal but no decision yet (e.g. restored from a snapshot) are listed too
+        symbols = {
+            symbol: {"decision": None, "indicators": None, **self.latest.get(symbol, {}),
+                     "signal": signals.get(symbol)}
+            for symbol in {**self.latest, **signals}
+        }
+        self.snapshot = ReadSnapshot(time.time(), signals, symbols, self.decisions)
+        self.changed = False
+        return self.snapshot
+
+    async def publish_when_changed(self, signals, interval=1.0):
+        """Publish at most every `interval` seconds, for modes without polling cycles."""
+        while True:
+            await asyncio.sleep(interval)
+            if self.changed:
+                self.publish(signals)
@@ -0,0 +1,271 @@
+import asyncio
+import multiprocessing
+import queue
+import signal
+import time
+import zlib
+from loguru import logger
+from app import config
+from app.data.client import AsyncBinanceClient
+from app.data.resample import WEEK_OFFSET_MS
+from app.data.schemas import KlineIntervals
+from app.data.snapshot import SnapshotStore
+from app.data.stream import KlineStream
+from app.metrics import CYCLE_SECONDS, LATE_SYMBOLS, QUEUE_DEPTH
+from app.monitor import SymbolMonitor
+
+
+def shard_of(symbol, shards):
+    """Stable shard of a symbol (crc32, unlike hash() which is salted per process)."""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+def partition(symbols, shards):
+    """Split symbols into `shards` lists; a symbol always lands on the same shard."""
+    parts = [[] for _ in range(shards)]
+    for symbol in symbols:
+        parts[shard_of(symbol, shards)].append(symbol)
+    return parts
+
+
+def next_candle_close(interval, now=None):
+    """Unix time (seconds) at which the current candle of `interval` closes."""
+    interval_ms = KlineIntervals.to_milliseconds(interval)
+    offset = WEEK_OFFSET_MS if interval == "1w" else 0
+    now_ms = int((time.time() if now is None else now) * 1000)
+    return (now_ms - (now_ms - offset) % interval_ms + interval_ms) / 1000
+
+
+class MonitorHealth:
+    """Readiness and liveness of the monitoring loop.
+
+    Ready once every symbol has been checked (or a candle close was handled);
+    alive while checks keep happening at least once per candle, with slack.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or config.KLINE_INTERVAL
+        self.started = time.time()
+        self.ready = False
+        self.last_beat = None
+        self.last_cycle = None
+
+    def beat(self):
+        self.last_beat = time.time()
+
+    def cycle_finished(self, report):
+        self.last_cycle = report
+        self.ready = True
+        self.beat()
+
+    def alive(self):
+        interval_s = KlineIntervals.to_milliseconds(self.interval) / 1000
+        last = self.last_beat or self.started
+        return time.time() - last < 2 * interval_s + config.CYCLE_DEADLINE
+
+    def report(self):
+        return {
+            "ready": self.ready,
+            "alive": self.alive(),
+            "interval": self.interval,
+            "started": self.started,
+            "last_beat": self.last_beat,
+            "last_cycle": self.last_cycle,
+        }
+
+
+async def run_candle_cycles(symbols, check, interval=None, concurrency=None, settle_delay=None,
+                            deadline=None, on_cycle=None):
+    """Call `check(symbol)` for every symbol right after each candle close of `interval`.
+
+    The first cycle runs immediately. Every later cycle starts `settle_delay`
+    seconds after the close; symbols still running after `deadline` seconds
+    are cancelled and reported as late, so they never delay the next cycle.
+    `on_cycle(report)` is called after every cycle.
+    """
+    interval = interval or config.KLINE_INTERVAL
+    concurrency = concurrency or config.FETCH_CONCURRENCY
+    settle_delay = config.CANDLE_SETTLE_DELAY if settle_delay is None else settle_delay
+    interval_s = KlineIntervals.to_milliseconds(interval) / 1000
+    # A settle delay as long as the interval would leave no time to check (and skip closes)
+    if settle_delay > interval_s / 2:
+        logger.warning(f"Settle delay {settle_delay:g}s is too long for {interval} candles, "
+                       f"using {interval_s / 2:g}s")
+        settle_delay = interval_s / 2
+    deadline = min(deadline or config.CYCLE_DEADLINE, interval_s - settle_delay)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check_symbol(symbol):
+        async with semaphore:
+            await check(symbol)
+
+    while True:
+        started = time.time()
+        tasks = {symbol: asyncio.create_task(check_symbol(symbol)) for symbol in symbols}
+        try:
+            await asyncio.wait(tasks.values(), timeout=deadline)
+        except asyncio.CancelledError:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        late = [symbol for symbol, task in tasks.items() if not task.done()]
+        for symbol in late:
+            tasks[symbol].cancel()
+        duration = time.time() - started
+        CYCLE_SECONDS.observe(duration)
+        LATE_SYMBOLS.inc(len(late))
+
+        if late:
+            logger.warning(f"{len(late)}/{len(symbols)} symbols missed the {deadline:g}s deadline: {late}")
+        else:
+            logger.info(f"Checked {len(symbols)} symbols in {duration:.2f}s")
+        if on_cycle is not None:
+            on_cycle({"started": started, "duration": duration, "symbols": len(symbols), "late": late})
+
+        # Sleep until just after the next candle close (skipping closes we already ran past)
+        wake = next_candle_close(interval, time.time()) + settle_delay
+        await asyncio.sleep(max(0.0, wake - time.time()))
+
+
+class ShardWorker:
+    """Monitors one shard of the symbols in a worker process with its own event loop.
+
+    Buffers and indicator state stay in the worker (and its own snapshot file);
+    only the decisions are sent back to the server process.
+    """
+
+    def __init__(self, shard, shards, symbols, decisions, concurrency):
+        self.shard = shard
+        self.symbols = symbols
+        self.decisions = decisions
+        self.concurrency = concurrency
+        self.client = AsyncBinanceClient(max_connections=concurrency)
+        self.monitor = SymbolMonitor(self.client, self.publish)
+        self.snapshot_store = SnapshotStore(f"{config.SNAPSHOT_PATH}.shard{shard}of{shards}")
+
+    async def publish(self, symbol, close_time, close_price, opportunity, indicators=None):
+        self.decisions.put((symbol, close_time, close_price, opportunity, indicators))
+
+    async def fetch_and_check(self, symbol):
+        try:
+            await self.monitor.fetch_and_check(symbol)
+        except Exception as e:
+            logger.error(f"Error fetching data for {symbol}: {str(e)}")
+
+    async def poll(self):
+        await run_candle_cycles(self.symbols, self.fetch_and_check, self.monitor.interval, self.concurrency)
+
+    async def stream(self):
+        stream = KlineStream(self.symbols, self.monitor.interval, self.monitor.cache, self.client,
+                             self.monitor.check_timeframes, backfill_concurrency=self.concurrency)
+        await stream.run()
+
+    async def snapshot_periodically(self):
+        while True:
+            await asyncio.sleep(config.SNAPSHOT_INTERVAL)
+            try:
+                payload = self.snapshot_store.dumps(self.monitor.state())
+                await asyncio.to_thread(self.snapshot_store.write, payload)
+            except Exception as e:
+                logger.error(f"Shard {self.shard}: failed to save snapshot: {str(e)}")
+
+    async def run(self):
+        state = self.snapshot_store.load()
+        if state:
+            self.monitor.restore(state)
+        snapshots = asyncio.create_task(self.snapshot_periodically())
+        logger.info(f"Shard {self.shard}: monitoring {len(self.symbols)} symbols")
+        try:
+            await (self.stream() if config.INGESTION_MODE == "websocket" else self.poll())
+        finally:
+            snapshots.cancel()
+            self.snapshot_store.save(self.monitor.state())
+            await self.client.aclose()
+
+
+def run_worker(shard, shards, symbols, decisions, concurrency):
+    """Entry point of a worker process; SIGTERM stops it after a final snapshot."""
+    # Ctrl+C reaches the whole process group: let the server process decide when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async def main():
+        task = asyncio.current_task()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        await ShardWorker(shard, shards, symbols, decisions, concurrency).run()
+
+    try:
+        asyncio.run(main())
+    except asyncio.CancelledError:
+        pass
+
+
+class ShardedScheduler:
+    """Spreads the symbols over worker processes and feeds their decisions to one handler.
+
+    `on_decision(symbol, close_time, close_price, opportunity, indicators)` runs in the
+    server process, so it stays the single owner of the signals. Workers that
+    die are restarted with the same shard, warm from their last snapshot.
+    """
+
+    def __init__(self, symbols, workers, on_decision, concurrency=None):
+        self.context = multiprocessing.get_context("spawn")
+        self.shards = partition(symbols, workers)
+        self.on_decision = on_decision
+        # Split the connection budget so the total load on Binance stays the same
+        self.concurrency = max(1, (concurrency or config.FETCH_CONCURRENCY) // workers)
+        self.decisions = self.context.Queue()
+        self.processes = {}
+
+    def _start(self, shard):
+        process = self.context.Process(
+            target=run_worker, name=f"shard-{shard}", daemon=True,
+            args=(shard, len(self.shards), self.shards[shard], self.decisions, self.concurrency),
+        )
+        process.start()
+        self.processes[shard] = process
+
+    async def run(self):
+        for shard, symbols in enumerate(self.shards):
+            if symbols:
+                self._start(shard)
+        logger.info(f"Started {len(self.processes)} shard workers for {sum(map(len, self.shards))} symbols")
+        try:
+            await asyncio.gather(self._receive(), self._supervise())
+        finally:
+            self.stop()
+
+    def _next_decision(self):
+        try:
+            return self.decisions.get(timeout=1)
+        except queue.Empty:
+            return None
+
+    async def _receive(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            decision = await loop.run_in_executor(None, self._next_decision)
+            QUEUE_DEPTH.set(self.decisions.qsize(), queue="decisions")
+            if decision is None:
+                continue
+            try:
+                await self.on_decision(*decision)
+            except Exception as e:
+                logger.error(f"Error handling decision for {decision[0]}: {str(e)}")
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(1)
+            for shard, process in list(self.processes.items()):
+                if not process.is_alive():
+                    logger.error(f"Shard {shard} exited with code {process.exitcode}, restarting it")
+                    self._start(shard)
+
+    def stop(self, timeout=10):
+        """Ask every worker to save its snapshot and exit, killing the ones that don't."""
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        self.processes.clear()
@@ -0,0 +1,160 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from loguru import logger
+from app.strategies.indicators import Strategy, DEFAULT_PARAMS
+from app.strategies.rules import RuleSet, default_rules
+
+CYCLE_COLUMNS = [
+    "buy_price", "sell_time", "sell_price", "Profit_Cycle",
+    "holding_period", "trigger", "total_trades",
+    "stop_loss", "profit_threshold", "current_amount", "Gain/Loss Cycle"
+]
+RULE_PARAMS = ("rsi_buy", "rsi_sell")
+EXIT_PARAMS = ("stop_loss", "profit_threshold")
+
+
+def _first_index(condition, start, end, chunk=256):
+    """First index in [start, end) where condition(a, b) is True, scanning in growing chunks."""
+    while start < end:
+        stop = min(end, start + chunk)
+        hits = np.flatnonzero(condition(start, stop))
+        if len(hits):
+            return start + int(hits[0])
+        start, chunk = stop, chunk * 2
+    return None
+
+
+def backtest(data, stop_loss=0.02, profit_threshold=0.05, initial_capital=10000, opportunity=None):
+    """Simulate Buy -> exit cycles on the output of Strategy.enhanced_strategy.
+
+    A position is opened at the close of a Buy candle when flat. It is closed
+    at the stop-loss or profit-target price when a later candle's low/high
+    reaches it (stop-loss first), or at the close of a Sell candle above the
+    buy price, like the live service. Capital is fully reinvested every cycle.
+    """
+    close = data['close_price'].to_numpy(dtype=np.float64)
+    high = data['high_price'].to_numpy(dtype=np.float64)
+    low = data['low_price'].to_numpy(dtype=np.float64)
+    close_time = pd.DatetimeIndex(data['close_time'])
+    if opportunity is None:
+        opportunity = data['opportunity_type'].to_numpy(dtype=object)
+    buys = np.flatnonzero(opportunity == "Buy")
+    sells = opportunity == "Sell"
+    n = len(close)
+
+    cycles = []
+    capital = initial_capital
+    start = 0
+    while True:
+        k = np.searchsorted(buys, start)
+        if k == len(buys):
+            break
+        entry = buys[k]
+        buy_price = close[entry]
+        stop_price = buy_price * (1 - stop_loss)
+        target_price = buy_price * (1 + profit_threshold)
+
+        exit_index = _first_index(
+            lambda a, b: (low[a:b] <= stop_price) | (high[a:b] >= target_price) | (sells[a:b] & (close[a:b] > buy_price)),
+            entry + 1, n,
+        )
+        if exit_index is None:
+            # Still holding at the end of the data
+            break
+
+        if low[exit_index] <= stop_price:
+            trigger, sell_price = "Stop_Loss", stop_price
+        elif high[exit_index] >= target_price:
+            trigger, sell_price = "Profit", target_price
+        else:
+            trigger, sell_price = "Sell", close[exit_index]
+
+        profit_cycle = capital / buy_price * (sell_price - buy_price)
+        capital += profit_cycle
+        holding_period_minutes = (close_time[exit_index] - close_time[entry]).total_seconds() / 60
+        cycles.append([
+            close_time[entry], buy_price, close_time[exit_index], sell_price, profit_cycle,
+            f"{holding_period_minutes:.2f} minutes ({holding_period_minutes / 60:.2f} hours)",
+            trigger, len(cycles) + 1, stop_loss, profit_threshold, capital,
+            'Gain' if profit_cycle > 0 else 'Loss',
+        ])
+        start = exit_index + 1
+
+    output_df = pd.DataFrame(cycles, columns=["buy_time"] + CYCLE_COLUMNS)
+    output_df.set_index("buy_time", inplace=True)
+    return output_df
+
+
+def parameter_grid(grid):
+    """Expand {"param": [values, ...]} into a list of parameter dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# Per-process state of the sweep workers
+_frames = {}
+_indicator_cache = {}
+
+
+def _init_worker(frames):
+    global _frames
+    _frames = frames
+    _indicator_cache.clear()
+
+
+def _indicator_key(params):
+    return tuple(sorted((k, v) for k, v in params.items() if k in DEFAULT_PARAMS))
+
+
+def _indicators(symbol, params):
+    # Sweeps vary rule thresholds and exits far more often than indicators: reuse them
+    key = (symbol, _indicator_key(params))
+    if key not in _indicator_cache:
+        if len(_indicator_cache) >= 8:
+            _indicator_cache.clear()
+        strategy_params = {k: v for k, v in params.items() if k in DEFAULT_PARAMS}
+        _indicator_cache[key] = Strategy(_frames[symbol], params=strategy_params).enhanced_strategy()
+    return _indicator_cache[key]
+
+
+def _run_task(task):
+    symbol, params, initial_capital = task
+    data = _indicators(symbol, params)
+    rules = RuleSet(default_rules(**{k: params[k] for k in RULE_PARAMS if k in params}))
+    exits = {k: params[k] for k in EXIT_PARAMS if k in params}
+    cycles = backtest(data, initial_capital=initial_capital, opportunity=rules.evaluate(data), **exits)
+
+    final_capital = cycles['current_amount'].iloc[-1] if len(cycles) else initial_capital
+    return {
+        "symbol": symbol, **params,
+        "trades": len(cycles),
+        "win_rate": float((cycles['Profit_Cycle'] > 0).mean()) if len(cycles) else 0.0,
+        "final_capital": final_capital,
+        "return_pct": (final_capital / initial_capital - 1) * 100,
+    }
+
+
+def sweep(frames, grid, initial_capital=10000, processes=None):
+    """Backtest every parameter combination of `grid` on every symbol in a process pool.
+
+    `frames` maps symbols to klines frames (BinanceKlines.convert_data_to_dataframe);
+    `grid` may contain Strategy params, rsi_buy/rsi_sell and stop_loss/profit_threshold.
+    Returns one summary row per (symbol, parameter set).
+    """
+    unknown = set(grid) - set(DEFAULT_PARAMS) - set(RULE_PARAMS) - set(EXIT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+    # Keep tasks sharing indicator settings together so workers reuse them
+    tasks = [(symbol, params, initial_capital) for symbol in frames for params in parameter_grid(grid)]
+    tasks.sort(key=lambda task: (task[0], _indicator_key(task[1])))
+
+    processes = processes or os.cpu_count()
+    chunksize = max(1, len(tasks) // (processes * 4))
+    logger.info(f"Running {len(tasks)} backtests on {processes} processes")
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(frames,)) as executor:
+        results = list(executor.map(_run_task, tasks, chunksize=chunksize))
+    return pd.DataFrame(results)
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from loguru import logger
+from app.data.cache import widen
+from app.strategies.indicators import DEFAULT_PARAMS, DEFAULT_RULESET, format_close_time
+
+DAY_MS = 86_400_000
+STACKED_COLUMNS = ("close_price", "high_price", "low_price", "volume")
+
+
+def _nan_like(x):
+    return np.full(x.shape, np.nan)
+
+
+def sma(x, length):
+    """Rolling mean along the time axis of a (symbols x time) array."""
+    out = _nan_like(x)
+    if x.shape[1] >= length:
+        out[:, length - 1:] = sliding_window_view(x, length, axis=1).mean(axis=-1)
+    return out
+
+
+def bbands(x, length=20, std=2.0):
+    """Lower and upper Bollinger Bands (population standard deviation, like pandas_ta)."""
+    lower, upper = _nan_like(x), _nan_like(x)
+    if x.shape[1] >= length:
+        windows = sliding_window_view(x, length, axis=1)
+        mid = windows.mean(axis=-1)
+        deviation = std * windows.std(axis=-1)
+        lower[:, length - 1:], upper[:, length - 1:] = mid - deviation, mid + deviation
+    return lower, upper
+
+
+def ema(x, length):
+    """EMA seeded with the SMA of the first `length` values (pandas_ta.ema)."""
+    out = _nan_like(x)
+    if x.shape[1] < length:
+        return out
+    alpha = 2.0 / (length + 1)
+    value = x[:, :length].mean(axis=1)
+    out[:, length - 1] = value
+    for t in range(length, x.shape[1]):
+        value = (1 - alpha) * value + alpha * x[:, t]
+        out[:, t] = value
+    return out
+
+
+def rsi(x, length=14):
+    """RSI on Wilder's adjusted moving average (pandas_ta.rsi)."""
+    out = _nan_like(x)
+    change = np.diff(x, axis=1)
+    gains, losses = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+    decay = 1.0 - 1.0 / length
+    gain = loss = weight = 0.0
+    for t in range(change.shape[1]):
+        weight *= decay
+        gain = (weight * gain + gains[:, t]) / (weight + 1.0)
+        loss = (weight * loss + losses[:, t]) / (weight + 1.0)
+        weight += 1.0
+        if t + 1 >= length:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[:, t + 1] = 100 * gain / (gain + loss)
+    return out
+
+
+def macd(x, fast=12, slow=26, signal=9):
+    """MACD line and signal; the signal EMA starts at the first valid MACD value."""
+    line = ema(x, fast) - ema(x, slow)
+    signal_line = _nan_like(x)
+    signal_line[:, slow - 1:] = ema(line[:, slow - 1:], signal)
+    return line, signal_line
+
+
+def session_vwap(high, low, close, volume, close_time_ms):
+    """VWAP of the typical price, restarting every UTC day of the candle close time."""
+    weighted = np.cumsum((high + low + close) / 3 * volume, axis=1)
+    total = np.cumsum(volume, axis=1)
+
+    # Subtract the running sums as they stood just before each day started
+    day = close_time_ms // DAY_MS
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    day_start = starts[np.searchsorted(starts, np.arange(len(day)), side="right") - 1]
+    before = day_start - 1
+    base_weighted = np.where(before >= 0, weighted[:, np.maximum(before, 0)], 0.0)
+    base_total = np.where(before >= 0, total[:, np.maximum(before, 0)], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (weighted - base_weighted) / (total - base_total)
+
+
+def batch_indicators(close, high, low, volume, close_time_ms, params=None):
+    """All enhanced_strategy indicators for aligned (symbols x time) arrays in one pass."""
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    bb_lower, bb_upper = bbands(close, p['bb_length'], float(p['bb_std']))
+    macd_line, macd_signal = macd(close, p['macd_fast'], p['macd_slow'], p['macd_signal'])
+    return {
+        "close_price": close,
+        "RSI": rsi(close, p['rsi_length']),
+        "BB_lower": bb_lower,
+        "BB_upper": bb_upper,
+        "MA_10": sma(close, p['ma_fast']),
+        "MA_50": sma(close, p['ma_slow']),
+        "EMA_9": ema(close, p['ema_fast']),
+        "EMA_21": ema(close, p['ema_slow']),
+        "MACD": macd_line,
+        "MACD_signal": macd_signal,
+        "VWAP": session_vwap(high, low, close, volume, close_time_ms),
+    }
+
+
+def _tail(klines, length):
+    """(close_time_ms, {column: values}) for the last `length` candles of a frame or KlineRingBuffer."""
+    if isinstance(klines, pd.DataFrame):
+        klines = klines.iloc[-length:]
+        close_time = klines.index.to_numpy().astype("datetime64[ms]").astype(np.int64)
+        return close_time, {col: klines[col].to_numpy(dtype=np.float64) for col in STACKED_COLUMNS}
+    _, close_time, values = klines.since(None)
+    return close_time[-length:], {col: values[-length:, klines.column_index(col)] for col in STACKED_COLUMNS}
+
+
+def stack_klines(klines, length=None):
+    """Stack klines frames or KlineRingBuffers into aligned (symbols x time) arrays.
+
+    `length` defaults to the longest series: symbols with fewer candles (e.g. new
+    listings) are skipped rather than cutting every other symbol's history short.
+    Only symbols whose last `length` close times match the most recent series
+    are kept. Returns (symbols, close_time_ms, {column: array}); no symbols if
+    none has `length` candles.
+    """
+    length = length or max((len(k) for k in klines.values()), default=0)
+    series = {symbol: _tail(k, length) for symbol, k in klines.items() if len(k) >= length > 0}
+    short = sorted(symbol for symbol, k in klines.items() if len(k) < length)
+    if short:
+        logger.warning(f"Skipping {len(short)} symbols with fewer than {length} candles: {short}")
+    if not series:
+        if klines:
+            logger.warning(f"No symbol has {length} candles to stack")
+        return [], np.empty(0, dtype=np.int64), {}
+    reference = max((times for times, _ in series.values()), key=lambda t: t[-1])
+
+    symbols = [symbol for symbol, (times, _) in series.items() if np.array_equal(times, reference)]
+    skipped = set(series) - set(symbols)
+    if skipped:
+        logger.warning(f"Skipping {len(skipped)} symbols not aligned with the latest candles: {sorted(skipped)}")
+
+    stacked = {col: np.vstack([series[symbol][1][col] for symbol in symbols]) for col in STACKED_COLUMNS}
+    # float32 (LOW_MEMORY) buffers are widened for the math
+    columns = {col: values.astype(np.float64, copy=False) for col, values in stacked.items()}
+    if stacked["close_price"].dtype != np.float64:
+        # The last close is reported: keep it readable like the engine and the feature graph do
+        columns["close_price"][:, -1] = widen(stacked["close_price"][:, -1])
+    return symbols, reference, columns
+
+
+def batch_opportunities(klines, rules=None, params=None, length=None):
+    """Evaluate the enhanced strategy for many symbols (frames or KlineRingBuffers) at once.
+
+    Returns {symbol: (close_time, close_price, opportunity)} like get_opportunity.
+    """
+    rules = rules or DEFAULT_RULESET
+    if not klines:
+        return {}
+    symbols, close_time_ms, columns = stack_klines(klines, length)
+    if not symbols:
+        return {}
+    indicators = batch_indicators(columns["close_price"], columns["high_price"], columns["low_price"],
+                                  columns["volume"], close_time_ms, params)
+
+    last = {name: values[:, -1] for name, values in indicators.items()}
+    opportunities = rules.evaluate(last)
+    close_time = format_close_time(pd.Timestamp(int(close_time_ms[-1]), unit="ms", tz="UTC"))
+    return {
+        symbol: (close_time, float(last["close_price"][i]), opportunities[i])
+        for i, symbol in enumerate(symbols)
+    }
@@ -0,0 +1,158 @@
+import re
+import numpy as np
+from app.data.cache import widen
+from app.strategies import batch
+from app.strategies.exceptions import StrategyError
+
+# Candle columns every graph starts from; all other features are computed from them
+BASE_COLUMNS = ("open_price", "high_price", "low_price", "close_price", "volume")
+FEATURE_PATTERN = re.compile(r"^\s*(\w+)\s*(?:\((.*)\))?\s*$")
+
+# kind -> compute(graph, *params); dependencies are other features read from the graph
+FEATURES = {}
+
+
+def feature(kind):
+    def register(compute):
+        FEATURES[kind] = compute
+        return compute
+    return register
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def parse_feature(spec):
+    """("ema", (21,)) for "ema(21)"; base columns and features without parameters have no params."""
+    match = FEATURE_PATTERN.match(spec)
+    if match is None:
+        raise StrategyError(f"Invalid feature: {spec!r}")
+    kind, args = match.groups()
+    try:
+        params = tuple(_number(arg) for arg in args.split(",")) if args and args.strip() else ()
+    except ValueError:
+        raise StrategyError(f"Invalid feature parameters: {spec!r}")
+    if kind not in FEATURES and kind not in BASE_COLUMNS:
+        raise StrategyError(f"Unknown feature: {spec!r}")
+    return kind, params
+
+
+def feature_name(kind, params=()):
+    """Canonical name of a feature, e.g. "bb_lower(20,2)"."""
+    return f"{kind}({','.join(map(str, params))})" if params else kind
+
+
+def _series(fn, *columns, **kwargs):
+    """Run a (symbols x time) batch indicator on single series."""
+    result = fn(*(column[None, :] for column in columns), **kwargs)
+    if isinstance(result, tuple):
+        return tuple(r[0] for r in result)
+    return result[0]
+
+
+@feature("sma")
+def _sma(graph, length):
+    return _series(batch.sma, graph["close_price"], length=length)
+
+
+@feature("stdev")
+def _stdev(graph, length):
+    # Population standard deviation, like pandas_ta.bbands
+    close = graph["close_price"]
+    out = np.full(close.shape, np.nan)
+    if len(close) >= length:
+        out[length - 1:] = np.lib.stride_tricks.sliding_window_view(close, length).std(axis=-1)
+    return out
+
+
+@feature("bb_lower")
+def _bb_lower(graph, length=20, std=2.0):
+    return graph[feature_name("sma", (length,))] - std * graph[feature_name("stdev", (length,))]
+
+
+@feature("bb_upper")
+def _bb_upper(graph, length=20, std=2.0):
+    return graph[feature_name("sma", (length,))] + std * graph[feature_name("stdev", (length,))]
+
+
+@feature("ema")
+def _ema(graph, length):
+    return _series(batch.ema, graph["close_price"], length=length)
+
+
+@feature("rsi")
+def _rsi(graph, length=14):
+    return _series(batch.rsi, graph["close_price"], length=length)
+
+
+@feature("macd")
+def _macd(graph, fast=12, slow=26, signal=9):
+    return graph[feature_name("ema", (fast,))] - graph[feature_name("ema", (slow,))]
+
+
+@feature("macd_signal")
+def _macd_signal(graph, fast=12, slow=26, signal=9):
+    # The signal EMA starts at the first valid MACD value
+    line = graph[feature_name("macd", (fast, slow, signal))]
+    out = np.full(line.shape, np.nan)
+    out[slow - 1:] = _series(batch.ema, line[slow - 1:], length=signal)
+    return out
+
+
+@feature("vwap")
+def _vwap(graph):
+    return _series(batch.session_vwap, graph["high_price"], graph["low_price"], graph["close_price"],
+                   graph["volume"], close_time_ms=graph.close_time)
+
+
+class FeatureGraph:
+    """Memoized features of one series of candles: every feature is computed at most once.
+
+    Features are looked up by spec ("rsi(14)", "bb_lower(20,2)", ...) and pull
+    their own dependencies from the graph, so shared intermediates (e.g. the
+    EMAs under MACD) are reused by every strategy reading the graph.
+    """
+
+    def __init__(self, columns, close_time):
+        self.columns = columns
+        self.close_time = close_time
+        self._values = {}
+        self.computed = 0
+
+    @classmethod
+    def from_frame(cls, data):
+        """Graph over a klines frame (BinanceKlines.convert_data_to_dataframe)."""
+        columns = {col: data[col].to_numpy(dtype=np.float64) for col in BASE_COLUMNS}
+        return cls(columns, data.index.to_numpy().astype("datetime64[ms]").astype(np.int64))
+
+    @classmethod
+    def from_buffer(cls, buffer, upto=None):
+        """Graph over a KlineRingBuffer, only up to the candle opened at `upto` if given."""
+        open_time, close_time, values = buffer.since(None)
+        if upto is not None:
+            keep = open_time <= upto
+            close_time, values = close_time[keep], values[keep]
+        # Copied: buffer views change on the next candle, and float32 buffers are widened for the math
+        columns = {col: values[:, buffer.column_index(col)].astype(np.float64) for col in BASE_COLUMNS}
+        # The close is also reported in the alerts: keep float32 (LOW_MEMORY) prices readable
+        if values.dtype != np.float64:
+            columns["close_price"] = widen(values[:, buffer.column_index("close_price")])
+        return cls(columns, close_time.copy())
+
+    def __len__(self):
+        return len(self.close_time)
+
+    def __getitem__(self, spec):
+        if spec in self.columns:
+            return self.columns[spec]
+        kind, params = parse_feature(spec)
+        if kind in BASE_COLUMNS:
+            return self.columns[kind]
+        name = feature_name(kind, params)
+        if name not in self._values:
+            self._values[name] = FEATURES[kind](self, *params)
+            self.computed += 1
+        return self._values[name]
+
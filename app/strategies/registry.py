@@ -0,0 +1,89 @@
+import json
+import os
+from loguru import logger
+from app.strategies.exceptions import StrategyError
+from app.strategies.features import parse_feature
+from app.strategies.indicators import DEFAULT_PARAMS, DEFAULT_RULESET
+from app.strategies.rules import RuleSet
+
+# name -> (RuleSet, {column: feature spec})
+STRATEGIES = {}
+
+
+def register_strategy(name, rules, features=None):
+    """Register a strategy evaluated on a shared FeatureGraph.
+
+    `rules` use the RuleSet format; their columns are feature specs such as
+    "rsi(14)" or "ema(21)", or names mapped to specs by `features`
+    (e.g. {"RSI": "rsi(14)"}). Features shared between strategies are
+    computed once per graph.
+    """
+    features = dict(features or {})
+    for spec in features.values():
+        parse_feature(spec)
+    STRATEGIES[name] = (rules if isinstance(rules, RuleSet) else RuleSet(rules), features)
+
+
+class _Aliased:
+    """Graph lookup through a strategy's column names."""
+
+    def __init__(self, graph, features):
+        self.graph = graph
+        self.features = features
+
+    def __getitem__(self, name):
+        try:
+            return self.graph[self.features.get(name, name)]
+        except StrategyError:
+            raise KeyError(name)
+
+
+def evaluate_strategies(graph, names=None, last_n=1):
+    """Opportunities of the last `last_n` candles of a graph for each registered strategy."""
+    results = {}
+    for name in names or STRATEGIES:
+        if name not in STRATEGIES:
+            raise StrategyError(f"Unknown strategy: {name}")
+        rules, features = STRATEGIES[name]
+        results[name] = rules.evaluate(_Aliased(graph, features), last_n)
+    return results
+
+
+def load_strategies(path=None):
+    """Register the strategies of a JSON file (STRATEGIES_FILE) and return their names.
+
+    The file maps names to {"features": {column: spec}, "rules": [...]}.
+    """
+    path = path or os.getenv("STRATEGIES_FILE")
+    if not path:
+        return []
+    with open(path) as f:
+        strategies = json.load(f)
+    for name, strategy in strategies.items():
+        try:
+            register_strategy(name, strategy["rules"], strategy.get("features"))
+        except (KeyError, TypeError, AttributeError):
+            raise StrategyError(f"A strategy needs a 'rules' list: {name!r}")
+    logger.info(f"Loaded {len(strategies)} strategies from {path}")
+    return list(strategies)
+
+
+def enhanced_features(params=None):
+    """Column names of Strategy.enhanced_strategy mapped to their feature specs."""
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    macd = f"{p['macd_fast']},{p['macd_slow']},{p['macd_signal']}"
+    return {
+        "RSI": f"rsi({p['rsi_length']})",
+        "BB_lower": f"bb_lower({p['bb_length']},{p['bb_std']})",
+        "BB_upper": f"bb_upper({p['bb_length']},{p['bb_std']})",
+        "MA_10": f"sma({p['ma_fast']})",
+        "MA_50": f"sma({p['ma_slow']})",
+        "EMA_9": f"ema({p['ema_fast']})",
+        "EMA_21": f"ema({p['ema_slow']})",
+        "MACD": f"macd({macd})",
+        "MACD_signal": f"macd_signal({macd})",
+        "VWAP": "vwap",
+    }
+
+
+register_strategy("enhanced", DEFAULT_RULESET, enhanced_features())
@@ -0,0 +1,147 @@
+import json
+import operator
+import os
+from functools import reduce
+import numpy as np
+from loguru import logger
+from app.strategies.exceptions import StrategyError
+
+
+def default_rules(rsi_buy=40, rsi_sell=70):
+    """Rules of Strategy.enhanced_strategy, checked in order: the first matching rule wins.
+
+    A condition is a [left, operator, right] term, where each side is a column name
+    or a number, or an {"all": [...]} / {"any": [...]} group of conditions.
+    """
+    return [
+        {
+            # Sell if RSI > 70, or price at the upper Bollinger Band with every trend turning down
+            "opportunity": "Sell",
+            "when": {"any": [
+                ["RSI", ">", rsi_sell],
+                {"all": [
+                    ["close_price", ">=", "BB_upper"],
+                    ["MA_10", "<", "MA_50"],
+                    ["EMA_9", "<", "EMA_21"],
+                    ["MACD", "<", "MACD_signal"],
+                    ["close_price", "<", "VWAP"],
+                ]},
+            ]},
+        },
+        {
+            # Buy if RSI < 40, price near lower Bollinger Band, and moving averages crossover
+            "opportunity": "Buy",
+            "when": {"all": [
+                ["RSI", "<", rsi_buy],
+                ["close_price", "<=", "BB_lower"],
+                ["MA_10", ">", "MA_50"],
+                ["EMA_9", ">", "EMA_21"],
+                ["MACD", ">", "MACD_signal"],
+                ["close_price", ">", "VWAP"],
+            ]},
+        },
+    ]
+
+
+DEFAULT_RULES = default_rules()
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class _Columns:
+    """Column lookup that slices every column to its last `last_n` values once."""
+
+    def __init__(self, data, last_n=None):
+        self.data = data
+        self.last_n = last_n
+        self._cache = {}
+
+    def __getitem__(self, name):
+        if name not in self._cache:
+            try:
+                column = np.asarray(self.data[name], dtype=np.float64)
+            except KeyError:
+                raise StrategyError(f"Rule references unknown column '{name}'")
+            self._cache[name] = column[-self.last_n:] if self.last_n else column
+        return self._cache[name]
+
+
+def _compile_operand(operand):
+    if isinstance(operand, str):
+        return lambda columns: columns[operand]
+    if isinstance(operand, (int, float)) and not isinstance(operand, bool):
+        return lambda columns: operand
+    raise StrategyError(f"Invalid rule operand: {operand!r}")
+
+
+def _compile_condition(condition):
+    if isinstance(condition, dict):
+        if len(condition) != 1 or next(iter(condition)) not in ("all", "any"):
+            raise StrategyError(f"A rule group needs exactly one 'all' or 'any' key: {condition!r}")
+        combine = operator.and_ if "all" in condition else operator.or_
+        terms = [_compile_condition(term) for term in next(iter(condition.values()))]
+        if not terms:
+            raise StrategyError(f"Empty rule group: {condition!r}")
+        return lambda columns: reduce(combine, (term(columns) for term in terms))
+
+    if isinstance(condition, (list, tuple)) and len(condition) == 3:
+        left, op, right = condition
+        if op not in OPERATORS:
+            raise StrategyError(f"Unsupported rule operator: {op!r}")
+        compare, left, right = OPERATORS[op], _compile_operand(left), _compile_operand(right)
+        return lambda columns: compare(left(columns), right(columns))
+
+    raise StrategyError(f"Invalid rule condition: {condition!r}")
+
+
+class RuleSet:
+    """Compiled opportunity rules evaluated as NumPy masks over whole columns."""
+
+    def __init__(self, rules=None):
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self._compiled = []
+        for rule in self.rules:
+            try:
+                self._compiled.append((rule["opportunity"], _compile_condition(rule["when"])))
+            except (KeyError, TypeError):
+                raise StrategyError(f"A rule needs 'opportunity' and 'when' keys: {rule!r}")
+
+    def evaluate(self, data, last_n=None):
+        """Opportunity per row (None when no rule matches) for a DataFrame or dict of columns.
+
+        With `last_n` only the last rows are evaluated and returned.
+        """
+        columns = _Columns(data, last_n)
+        result = None
+        # Apply the lowest priority rule first so earlier rules overwrite later ones
+        for opportunity, condition in reversed(self._compiled):
+            mask = np.asarray(condition(columns), dtype=bool)
+            if result is None:
+                result = np.full(mask.shape, None, dtype=object)
+            result[mask] = opportunity
+        return result
+
+    def classify(self, values):
+        """Opportunity for a single row of scalar values (None when no rule matches)."""
+        for opportunity, condition in self._compiled:
+            if condition(values):
+                return opportunity
+        return None
+
+
+def load_rules(path=None):
+    """Load rules from a JSON file (STRATEGY_RULES_FILE), falling back to DEFAULT_RULES."""
+    path = path or os.getenv("STRATEGY_RULES_FILE")
+    if not path:
+        return RuleSet()
+    with open(path) as f:
+        rules = json.load(f)
+    logger.info(f"Loaded {len(rules)} strategy rules from {path}")
+    return RuleSet(rules)
@@ -1,21 +1,25 @@
-import pandas as pd
 class DataFrameUtils:
     """Utility methods for working with DataFrames."""
 
     @staticmethod
     def fill_missing_values(data, strategy='mean'):
-        """Fill missing values in a DataFrame."""
-        if strategy == 'mean':
+        """Fill missing values in a DataFrame, keeping its column order.
+
+        'mean' fills with column means, which leak later rows into earlier ones;
+        'ffill' only carries earlier values forward, leading NaNs stay NaN.
+        """
+        if strategy in ('mean', 'ffill'):
             # Apply only to numeric columns
-            numeric_data = data.select_dtypes(include=['number'])
-            filled_numeric_data = numeric_data.fillna(numeric_data.mean())
-            # Combine with non-numeric columns
-            non_numeric_data = data.select_dtypes(exclude=['number'])
-            return pd.concat([filled_numeric_data, non_numeric_data], axis=1)
+            numeric = data.select_dtypes(include=['number']).columns
+            if strategy == 'mean':
+                filled = data[numeric].fillna(data[numeric].mean())
+            else:
+                filled = data[numeric].ffill()
+            data = data.copy(deep=False)
+            data[numeric] = filled
+            return data
         elif strategy == 'zero':
             # Apply filling zeros to all columns
             return data.fillna(0)
         else:
             raise ValueError("Unsupported strategy for filling missing values.")
-
-
@@ -0,0 +1,290 @@
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+from app.data.cache import widen
+from app.strategies.exceptions import StrategyError
+from app.strategies.indicators import DEFAULT_RULESET, format_close_time
+
+NAN = float("nan")
+DAY_MS = 86_400_000
+
+
+class SMA:
+    """Simple moving average over the last `length` values (pandas_ta.sma)."""
+
+    def __init__(self, length):
+        self.length = length
+        self.window = deque(maxlen=length)
+        self.value = NAN
+
+    def update(self, x, replace=False):
+        if replace and self.window:
+            self.window[-1] = x
+        else:
+            self.window.append(x)
+        self.value = math.fsum(self.window) / self.length if len(self.window) == self.length else NAN
+        return self.value
+
+
+class BollingerBands:
+    """SMA +/- `std` population standard deviations (pandas_ta.bbands, ddof=0)."""
+
+    def __init__(self, length=20, std=2.0):
+        self.std = std
+        self.mid = SMA(length)
+        self.lower = self.upper = NAN
+
+    def update(self, x, replace=False):
+        mid = self.mid.update(x, replace)
+        if math.isnan(mid):
+            self.lower = self.upper = NAN
+        else:
+            variance = math.fsum((v - mid) ** 2 for v in self.mid.window) / self.mid.length
+            deviation = self.std * math.sqrt(variance)
+            self.lower, self.upper = mid - deviation, mid + deviation
+        return self.lower, self.upper
+
+
+class EMA:
+    """EMA seeded with the SMA of the first `length` values (pandas_ta.ema, adjust=False)."""
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self._state = self._saved = (0, 0.0, NAN)  # (count, seed_sum, ema)
+        self.value = NAN
+
+    def update(self, x, replace=False):
+        if replace:
+            self._state = self._saved
+        else:
+            self._saved = self._state
+        count, seed_sum, ema = self._state
+        count += 1
+        if count < self.length:
+            seed_sum += x
+        elif count == self.length:
+            ema = (seed_sum + x) / self.length
+        else:
+            ema = (1 - self.alpha) * ema + self.alpha * x
+        self._state = (count, seed_sum, ema)
+        self.value = ema
+        return ema
+
+
+class WilderRSI:
+    """RSI on Wilder's moving average (pandas_ta.rsi: adjusted ewm with alpha=1/length)."""
+
+    def __init__(self, length=14):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        # (previous close, observations, gain avg, loss avg, weight)
+        self._state = self._saved = (NAN, 0, 0.0, 0.0, 0.0)
+        self.value = NAN
+
+    def update(self, x, replace=False):
+        if replace:
+            self._state = self._saved
+        else:
+            self._saved = self._state
+        prev_close, count, gain, loss, weight = self._state
+
+        if not math.isnan(prev_close):
+            change = x - prev_close
+            weight *= self.decay
+            gain = (weight * gain + max(change, 0.0)) / (weight + 1.0)
+            loss = (weight * loss + max(-change, 0.0)) / (weight + 1.0)
+            weight += 1.0
+            count += 1
+
+        self._state = (x, count, gain, loss, weight)
+        if count >= self.length and gain + loss != 0:
+            self.value = 100 * gain / (gain + loss)
+        else:
+            self.value = NAN
+        return self.value
+
+
+class MACD:
+    """MACD line and signal (pandas_ta.macd); the signal EMA starts at the first MACD value."""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.macd = self.macd_signal = NAN
+
+    def update(self, x, replace=False):
+        self.macd = self.fast.update(x, replace) - self.slow.update(x, replace)
+        # A revised candle has the same warm-up position, so the signal saw its first version
+        self.macd_signal = NAN if math.isnan(self.macd) else self.signal.update(self.macd, replace)
+        return self.macd, self.macd_signal
+
+
+class SessionVWAP:
+    """Volume weighted average of the typical price, reset every UTC day (pandas_ta.vwap)."""
+
+    def __init__(self):
+        self._state = self._saved = (None, 0.0, 0.0)  # (day, sum(price * volume), sum(volume))
+        self.value = NAN
+
+    def update(self, close_time_ms, high, low, close, volume, replace=False):
+        if replace:
+            self._state = self._saved
+        else:
+            self._saved = self._state
+        day, weighted, total = self._state
+
+        candle_day = close_time_ms // DAY_MS
+        if candle_day != day:
+            day, weighted, total = candle_day, 0.0, 0.0
+        weighted += (high + low + close) / 3 * volume
+        total += volume
+
+        self._state = (day, weighted, total)
+        self.value = weighted / total if total else NAN
+        return self.value
+
+
+class IndicatorEngine:
+    """Incremental version of the enhanced_strategy indicators, updated in O(1) per candle.
+
+    Feed candles in time order; a candle with the same open_time as the previous
+    one is treated as a revision of the still-forming candle and replaces it.
+    """
+
+    COLUMNS = ["RSI", "BB_lower", "BB_upper", "MA_10", "MA_50", "EMA_9", "EMA_21", "MACD", "MACD_signal", "VWAP"]
+
+    def __init__(self, rules=None):
+        self.rules = rules or DEFAULT_RULESET
+        self.reset()
+
+    def __getstate__(self):
+        # Compiled rules hold closures; snapshots restore the default rules
+        state = self.__dict__.copy()
+        del state["rules"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.rules = DEFAULT_RULESET
+
+    def reset(self):
+        self.rsi = WilderRSI(14)
+        self.bbands = BollingerBands(20, 2.0)
+        self.ma_10 = SMA(10)
+        self.ma_50 = SMA(50)
+        self.ema_9 = EMA(9)
+        self.ema_21 = EMA(21)
+        self.macd = MACD(12, 26, 9)
+        self.vwap = SessionVWAP()
+        self.last_open_time = None
+        self.last_close_time = None
+        self.close_price = NAN
+
+    def update(self, open_time_ms, close_time_ms, high, low, close, volume):
+        """Apply one candle and return the latest indicator values."""
+        if self.last_open_time is not None and open_time_ms < self.last_open_time:
+            raise StrategyError(f"Out of order candle: {open_time_ms} < {self.last_open_time}")
+        replace = open_time_ms == self.last_open_time
+
+        self.rsi.update(close, replace)
+        self.bbands.update(close, replace)
+        self.ma_10.update(close, replace)
+        self.ma_50.update(close, replace)
+        self.ema_9.update(close, replace)
+        self.ema_21.update(close, replace)
+        self.macd.update(close, replace)
+        self.vwap.update(close_time_ms, high, low, close, volume, replace)
+
+        self.last_open_time = open_time_ms
+        self.last_close_time = close_time_ms
+        self.close_price = close
+        return self.values()
+
+    def values(self):
+        return {
+            "close_price": self.close_price,
+            "RSI": self.rsi.value,
+            "BB_lower": self.bbands.lower,
+            "BB_upper": self.bbands.upper,
+            "MA_10": self.ma_10.value,
+            "MA_50": self.ma_50.value,
+            "EMA_9": self.ema_9.value,
+            "EMA_21": self.ema_21.value,
+            "MACD": self.macd.macd,
+            "MACD_signal": self.macd.macd_signal,
+            "VWAP": self.vwap.value,
+        }
+
+    def sync(self, buffer, upto=None):
+        """Feed the candles of a KlineRingBuffer that the engine has not seen yet.
+
+        With `upto` only candles opened at or before that time are fed.
+        """
+        open_time, close_time, values = buffer.since(self.last_open_time)
+        if self.last_open_time is not None and (not len(open_time) or open_time[0] != self.last_open_time):
+            # The buffer no longer overlaps with what we have seen: start over
+            self.reset()
+            open_time, close_time, values = buffer.since(None)
+        if upto is not None:
+            keep = open_time <= upto
+            open_time, close_time, values = open_time[keep], close_time[keep], values[keep]
+
+        high, low, volume = (values[:, buffer.column_index(col)].tolist()
+                             for col in ("high_price", "low_price", "volume"))
+        # Reported in the alerts: keep float32 (LOW_MEMORY) prices readable
+        close = widen(values[:, buffer.column_index("close_price")]).tolist()
+        for i, (t_open, t_close) in enumerate(zip(open_time.tolist(), close_time.tolist())):
+            self.update(t_open, t_close, high[i], low[i], close[i], volume[i])
+        return self.values()
+
+    def get_opportunity(self):
+        """Same (close_time, close_price, opportunity) tuple as indicators.get_opportunity."""
+        if self.last_close_time is None:
+            raise StrategyError("No candles have been fed to the indicator engine")
+        close_time = pd.Timestamp(self.last_close_time, unit="ms", tz="UTC")
+        return format_close_time(close_time), self.close_price, self.rules.classify(self.values())
+
+
+def compare_with_pandas_ta(data):
+    """Max absolute difference between the engine and the pandas_ta indicators on a klines frame.
+
+    Rows where pandas_ta is still warming up must be NaN in the engine too;
+    mismatches there are reported as infinite differences.
+    """
+    import pandas_ta as ta
+
+    close = data['close_price']
+    bbands = ta.bbands(close, length=20, std=2.0)
+    macd = ta.macd(close, fast=12, slow=26, signal=9)
+    reference = pd.DataFrame({
+        "RSI": ta.rsi(close, length=14),
+        "BB_lower": bbands['BBL_20_2.0'],
+        "BB_upper": bbands['BBU_20_2.0'],
+        "MA_10": ta.sma(close, length=10),
+        "MA_50": ta.sma(close, length=50),
+        "EMA_9": ta.ema(close, length=9),
+        "EMA_21": ta.ema(close, length=21),
+        "MACD": macd['MACD_12_26_9'],
+        "MACD_signal": macd['MACDs_12_26_9'],
+        "VWAP": ta.vwap(data['high_price'], data['low_price'], close, data['volume']),
+    })
+
+    engine = IndicatorEngine()
+    open_time = data['open_time'].to_numpy().astype("datetime64[ms]").astype(np.int64)
+    close_time = data.index.to_numpy().astype("datetime64[ms]").astype(np.int64)
+    rows = zip(open_time.tolist(), close_time.tolist(), data['high_price'].tolist(), data['low_price'].tolist(),
+               close.tolist(), data['volume'].tolist())
+    streamed = pd.DataFrame([engine.update(*row) for row in rows], index=data.index)[IndicatorEngine.COLUMNS]
+
+    report = {}
+    for col in IndicatorEngine.COLUMNS:
+        expected, actual = reference[col].to_numpy(), streamed[col].to_numpy()
+        if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+            report[col] = math.inf
+        else:
+            valid = ~np.isnan(expected)
+            report[col] = float(np.max(np.abs(expected[valid] - actual[valid]))) if valid.any() else 0.0
+    return report
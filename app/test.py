@@ -9,12 +9,13 @@ load_dotenv()
 # Access environment variables
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHANNEL_ID = os.getenv("CHANNEL_ID")
-logger.info(f"BOT_TOKEN: {BOT_TOKEN}, CHANNEL_ID: {CHANNEL_ID}")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+logger.info(f"CHANNEL_ID: {CHANNEL_ID}")
 
 TEST_MESSAGE = 'SALAM ANA L BOT hhh '
 
 def send_test_message():
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{BOT_TOKEN}/sendMessage"
     payload = {
         'chat_id': CHANNEL_ID,
         'text': TEST_MESSAGE
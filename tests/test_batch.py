@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+# app.strategies imports pandas_ta
+pytest.importorskip("pandas_ta")
+
+from app.data.cache import KlineRingBuffer
+from app.data.synthetic import synthetic_klines
+from app.strategies.batch import batch_indicators, stack_klines
+
+
+def buffers(histories):
+    result = {}
+    for symbol, rows in histories.items():
+        result[symbol] = KlineRingBuffer(1000)
+        result[symbol].extend(rows)
+    return result
+
+
+def test_short_series_do_not_cut_the_others():
+    histories = {f"S{i}USDT": synthetic_klines(1000, seed=i) for i in range(3)}
+    full = buffers(histories)
+    # A new listing with only its last 40 candles
+    with_listing = buffers({**histories, "NEWUSDT": synthetic_klines(1000, seed=9)[-40:]})
+
+    symbols, close_time, columns = stack_klines(with_listing)
+    expected_symbols, expected_close_time, expected = stack_klines(full)
+    assert symbols == expected_symbols
+    np.testing.assert_array_equal(close_time, expected_close_time)
+
+    indicators = batch_indicators(columns["close_price"], columns["high_price"], columns["low_price"],
+                                  columns["volume"], close_time)
+    assert not np.isnan(indicators["MA_50"][:, -1]).any()
+    for name, values in batch_indicators(expected["close_price"], expected["high_price"], expected["low_price"],
+                                         expected["volume"], expected_close_time).items():
+        np.testing.assert_array_equal(indicators[name][:, -1], values[:, -1])
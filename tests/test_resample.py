@@ -0,0 +1,106 @@
+import asyncio
+import json
+from app.data import resample
+from app.data.cache import KlineCache
+from app.data.resample import CandleAggregator, TimeframeResampler
+from app.data.synthetic import synthetic_klines
+
+MINUTE_MS = 60_000
+DAY_MS = 86_400_000
+TODAY = 1_700_006_400_000  # A UTC midnight
+
+
+class FakeClient:
+    """get_klines over fixed histories, paged like the exchange."""
+
+    def __init__(self, histories):
+        self.histories = histories
+        self.calls = 0
+
+    async def get_klines(self, symbol, interval, limit=1000, start_time=None, end_time=None, allow_empty=False):
+        self.calls += 1
+        rows = self.histories[interval]
+        if start_time is None:
+            return rows[-limit:]
+        return [row for row in rows if row[0] >= start_time][:limit]
+
+    async def get_klines_payload(self, symbol, interval, limit=1000, start_time=None, end_time=None,
+                                 allow_empty=False):
+        return json.dumps(await self.get_klines(symbol, interval, limit, start_time, end_time)).encode()
+
+
+def daily(rows):
+    """Exchange 1d candles of 1m rows."""
+    days = {}
+    for row in rows:
+        days.setdefault(row[0] - row[0] % DAY_MS, []).append(row)
+    candles = []
+    for day in sorted(days):
+        aggregator = CandleAggregator("1m", "1d")
+        aggregator.update(days[day])
+        candles.append(aggregator.aggregate())
+    return candles
+
+
+def test_current_period_is_rebuilt_from_every_base_candle(monkeypatch):
+    # Two full days and 1400 minutes of today: the current 1d candle spans two pages of 1m klines
+    minutes = synthetic_klines(2 * 1440 + 1400, interval_ms=MINUTE_MS, start_time=TODAY - 2 * DAY_MS)
+    client = FakeClient({"1m": minutes, "1d": daily(minutes)})
+    monkeypatch.setattr(resample.time, "time", lambda: (TODAY + 1400 * MINUTE_MS - 1) / 1000)
+
+    cache = KlineCache(capacity=10)
+    resampler = TimeframeResampler(cache, "1m", ["1d"])
+    asyncio.run(resampler.ensure(client, "BTCUSDT"))
+
+    buffer = cache.get("BTCUSDT", "1d")
+    open_time, _, values = buffer.since(None)
+    expected = daily(minutes)[-1]
+    assert int(open_time[-1]) == TODAY
+    assert values[-1, buffer.column_index("volume")] == float(expected[5])
+    assert values[-1, buffer.column_index("high_price")] == float(expected[2])
+
+
+def test_derived_candle_closes_with_its_last_base_candle(monkeypatch):
+    # The host clock is 30 ms behind the exchange when the last 1m candle of the 5m period closes
+    bucket = TODAY + 60 * MINUTE_MS
+    minutes = synthetic_klines(65, interval_ms=MINUTE_MS, start_time=TODAY)
+    client = FakeClient({"1m": minutes[:64], "5m": []})
+    monkeypatch.setattr(resample.time, "time", lambda: (bucket + 5 * MINUTE_MS - 30) / 1000)
+
+    cache = KlineCache(capacity=100)
+    resampler = TimeframeResampler(cache, "1m", ["5m"])
+    asyncio.run(cache.refresh(client, "BTCUSDT", "1m"))
+    asyncio.run(resampler.ensure(client, "BTCUSDT"))
+    assert resampler.pop_closed("BTCUSDT", minutes[63][0]) == []
+
+    # The stream reports the last base candle of the period closed (x: true)
+    cache.apply("BTCUSDT", "1m", [minutes[64]])
+    assert resampler.pop_closed("BTCUSDT", minutes[64][0]) == [("5m", bucket)]
+    assert resampler.pop_closed("BTCUSDT", minutes[64][0]) == []
+    open_time, _, values = cache.get("BTCUSDT", "5m").since(None)
+    assert int(open_time[-1]) == bucket
+    assert values[-1, cache.get("BTCUSDT", "5m").column_index("close_price")] == float(minutes[64][4])
+
+
+def test_reseed_rebuilds_the_aggregators(monkeypatch):
+    minutes = synthetic_klines(300, interval_ms=MINUTE_MS, start_time=TODAY)
+    client = FakeClient({"1m": minutes[:64], "5m": []})
+    clock = {"now": TODAY + 64 * MINUTE_MS - 30}
+    monkeypatch.setattr(resample.time, "time", lambda: clock["now"] / 1000)
+
+    cache = KlineCache(capacity=100)
+    resampler = TimeframeResampler(cache, "1m", ["5m"])
+    asyncio.run(cache.refresh(client, "BTCUSDT", "1m"))
+    asyncio.run(resampler.ensure(client, "BTCUSDT"))
+
+    # Far behind: the base buffer is reseeded from one raw page
+    client.histories["1m"] = minutes[:299]
+    clock["now"] = TODAY + 299 * MINUTE_MS - 30
+    buffer = asyncio.run(cache.refresh(client, "BTCUSDT", "1m"))
+    assert len(buffer) == 100 and buffer.last_open_time == minutes[298][0]
+
+    asyncio.run(resampler.ensure(client, "BTCUSDT"))
+    cache.apply("BTCUSDT", "1m", [minutes[299]])
+    assert resampler.pop_closed("BTCUSDT", minutes[299][0]) == [("5m", TODAY + 295 * MINUTE_MS)]
+    _, _, values = cache.get("BTCUSDT", "5m").since(None)
+    assert values[-1, buffer.column_index("open_price")] == float(minutes[295][1])
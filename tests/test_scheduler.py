@@ -0,0 +1,26 @@
+import asyncio
+import pytest
+
+# app.scheduler imports the monitor, which imports pandas_ta
+pytest.importorskip("pandas_ta")
+
+from app.scheduler import run_candle_cycles
+
+
+def test_settle_delay_longer_than_the_interval_still_checks():
+    reports = []
+
+    async def check(symbol):
+        await asyncio.sleep(0.05)
+
+    async def run():
+        # The default 2s settle delay is longer than a 1s candle
+        task = asyncio.create_task(run_candle_cycles(["BTCUSDT", "ETHUSDT"], check, interval="1s",
+                                                     settle_delay=2, on_cycle=reports.append))
+        await asyncio.sleep(2.5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert len(reports) >= 2
+    assert all(not report["late"] for report in reports)
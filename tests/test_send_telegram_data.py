@@ -0,0 +1,46 @@
+import asyncio
+import httpx
+from app.data import send_telegram_data
+from app.data.send_telegram_data import TelegramNotifier
+
+
+def deliver(handler, monkeypatch, max_retries=3):
+    """Run one _deliver against `handler`; returns the sleeps it asked for."""
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(send_telegram_data.asyncio, "sleep", sleep)
+
+    async def run():
+        notifier = TelegramNotifier("token", "chat", api_url="http://telegram.test", max_retries=max_retries,
+                                    global_rate=1000, chat_rate_per_minute=60000)
+        notifier._client = httpx.AsyncClient(base_url=notifier.api_url, transport=httpx.MockTransport(handler))
+        await notifier._deliver("chat", "hello")
+        await notifier._client.aclose()
+
+    asyncio.run(run())
+    return sleeps
+
+
+def test_flood_control_retries_are_capped(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(429, text="Too Many Requests", headers={"Retry-After": "7"})
+
+    sleeps = deliver(handler, monkeypatch, max_retries=3)
+    assert len(requests) == 4
+    assert [s for s in sleeps if s >= 1] == [7.0, 7.0, 7.0]
+
+
+def test_flood_control_waits_retry_after(monkeypatch):
+    responses = iter([
+        httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 3}}),
+        httpx.Response(429, text="<html>busy</html>"),
+        httpx.Response(200, json={"ok": True}),
+    ])
+    sleeps = deliver(lambda request: next(responses), monkeypatch)
+    assert [s for s in sleeps if s >= 1] == [3.0, 1.0]
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import time
+import numpy as np
+from app.data.klines import BinanceKlines
+from app.data.store import KlineStore, download_klines
+from app.data.synthetic import synthetic_klines
+
+MINUTE_MS = 60_000
+
+
+class FakeClient:
+    """Raw klines responses over a fixed history, like GET /api/v3/klines."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def get_klines_payload(self, symbol, interval, limit=1000, start_time=None, end_time=None,
+                                 allow_empty=False):
+        rows = [row for row in self.rows
+                if (start_time is None or row[0] >= start_time) and (end_time is None or row[0] <= end_time)]
+        rows = rows[:limit] if start_time is not None else rows[-limit:]
+        return json.dumps(rows).encode()
+
+
+def history(candles):
+    """1m klines up to the candle forming now."""
+    now_ms = int(time.time() * 1000)
+    start_time = now_ms - now_ms % MINUTE_MS - (candles - 1) * MINUTE_MS
+    return synthetic_klines(candles, interval_ms=MINUTE_MS, start_time=start_time)
+
+
+def load(store, client, limit=1000):
+    return asyncio.run(BinanceKlines("BTCUSDT", "1m").fetch_and_wrangle_klines_from_store(client, store, limit))
+
+
+def test_old_store_is_continued_without_holes(tmp_path):
+    rows = history(3000)
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", rows[:500])
+
+    frame = load(store, FakeClient(rows))
+    assert len(frame) == 1000
+    assert frame["open_time"].iloc[-1].value // 1_000_000 == rows[-1][0]
+    stored = store.read("BTCUSDT", "1m")
+    assert len(stored) == 2999
+    assert (np.diff(stored["open_time"].to_numpy().astype(np.int64)) == MINUTE_MS * 1_000_000).all()
+
+    # Resuming later only fetches what is new
+    assert asyncio.run(download_klines(FakeClient(rows), store, "BTCUSDT", "1m", rows[0][0]))[0].size == 1
+
+
+def test_store_shorter_than_limit_falls_back_to_rest(tmp_path):
+    rows = history(3000)
+    store = KlineStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", rows[-101:-1])
+
+    frame = load(store, FakeClient(rows))
+    assert len(frame) == 1000
+    np.testing.assert_array_equal(frame["open_time"].to_numpy().astype("datetime64[ms]").astype(np.int64),
+                                  [row[0] for row in rows[-1000:]])
@@ -0,0 +1,39 @@
+import asyncio
+import socket
+from app.data.cache import KlineCache
+from app.data.client import AsyncBinanceClient
+from app.data.replay_server import KlineReplay
+from app.data.stream import KlineStream
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_invalid_symbol_does_not_stop_the_stream():
+    port = free_port()
+    replay = KlineReplay.synthetic(["BTCUSDT", "ETHUSDT"], "1s", candles=1200, speed=10)
+    closed = []
+
+    async def on_candle_closed(symbol, buffer, open_time):
+        closed.append(symbol)
+
+    async def run():
+        server = asyncio.create_task(replay.serve("127.0.0.1", port))
+        await asyncio.sleep(0.3)
+        async with AsyncBinanceClient(base_url=f"http://127.0.0.1:{port}") as client:
+            # MATICUSDT is unknown to the exchange: its backfill answers 400
+            stream = KlineStream(["BTCUSDT", "MATICUSDT", "ETHUSDT"], "1s", KlineCache(), client, on_candle_closed,
+                                 url=f"ws://127.0.0.1:{port}")
+            task = asyncio.create_task(stream.run())
+            await asyncio.sleep(1.5)
+            task.cancel()
+            server.cancel()
+            await asyncio.gather(task, server, return_exceptions=True)
+
+    asyncio.run(run())
+    assert closed.count("BTCUSDT") >= 3
+    assert closed.count("ETHUSDT") >= 3
+    assert "MATICUSDT" not in closed
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+# The engine is checked against pandas_ta, which app.strategies also imports
+pytest.importorskip("pandas_ta")
+
+from app.data.cache import build_klines_frame, parse_kline_rows
+from app.data.synthetic import synthetic_klines
+from app.strategies.streaming import IndicatorEngine, compare_with_pandas_ta
+
+ROWS = synthetic_klines(3000, seed=7)
+
+
+def test_engine_matches_pandas_ta():
+    report = compare_with_pandas_ta(build_klines_frame(*parse_kline_rows(ROWS)))
+    assert set(report) == set(IndicatorEngine.COLUMNS)
+    for col, difference in report.items():
+        assert difference < 1e-6, f"{col} differs by {difference}"
+
+
+def feed(engine, rows):
+    open_time, close_time, _, values = parse_kline_rows(rows)
+    high, low, close, volume = values[:, 1], values[:, 2], values[:, 3], values[:, 4]
+    for i in range(len(rows)):
+        engine.update(int(open_time[i]), int(close_time[i]), high[i], low[i], close[i], volume[i])
+    return engine.values()
+
+
+def forming_revisions(row, rng, count=3):
+    """Earlier states of a candle before its final `row`: same open_time, other high/low/close/volume."""
+    revisions = []
+    for _ in range(count):
+        revision = list(row)
+        for index in (2, 3, 4, 5):
+            revision[index] = f"{float(row[index]) * (1 + rng.normal(0, 0.002)):.8f}"
+        revisions.append(revision)
+    return revisions
+
+
+def test_revised_candles_end_like_final_rows():
+    rng = np.random.default_rng(0)
+    rows = ROWS[:500]
+    revised = []
+    for row in rows:
+        revised += forming_revisions(row, rng) + [row]
+
+    expected = feed(IndicatorEngine(), rows)
+    actual = feed(IndicatorEngine(), revised)
+    assert actual.keys() == expected.keys()
+    for col in expected:
+        assert actual[col] == pytest.approx(expected[col], rel=1e-9, abs=1e-9), col